@@ -0,0 +1,241 @@
+import dataclasses
+import math
+from itertools import product
+
+from muscad import Composite, Union, Difference, Intersection, Part, Hole, Misc, Translation, Rotation, Mirroring, Scaling, Color, LinearExtrusion, RotationalExtrusion, Slide, Hull
+from muscad.transformations import Render
+
+
+SIDES = ("left", "right", "back", "front", "bottom", "top")
+
+
+@dataclasses.dataclass(frozen=True)
+class Bounds:
+    left: float
+    right: float
+    back: float
+    front: float
+    bottom: float
+    top: float
+
+    @property
+    def width(self):
+        return self.right - self.left
+
+    @property
+    def depth(self):
+        return self.front - self.back
+
+    @property
+    def height(self):
+        return self.top - self.bottom
+
+    @property
+    def center_x(self):
+        return (self.right + self.left) / 2
+
+    @property
+    def center_y(self):
+        return (self.front + self.back) / 2
+
+    @property
+    def center_z(self):
+        return (self.top + self.bottom) / 2
+
+    def corners(self):
+        return product((self.left, self.right), (self.back, self.front), (self.bottom, self.top))
+
+    def translated(self, x=0, y=0, z=0) -> "Bounds":
+        return Bounds(self.left + x, self.right + x, self.back + y, self.front + y, self.bottom + z, self.top + z)
+
+    def overridden(self, **sides) -> "Bounds":
+        return dataclasses.replace(self, **{k: v for k, v in sides.items() if v is not None})
+
+
+def from_points(points) -> Bounds:
+    xs, ys, zs = zip(*points)
+    return Bounds(min(xs), max(xs), min(ys), max(ys), min(zs), max(zs))
+
+
+def union(children: list[Bounds]) -> Bounds:
+    # same convention as muscad: an empty union sits at the origin
+    if not children:
+        return Bounds(0, 0, 0, 0, 0, 0)
+    return Bounds(
+            min(b.left for b in children), max(b.right for b in children),
+            min(b.back for b in children), max(b.front for b in children),
+            min(b.bottom for b in children), max(b.top for b in children),
+            )
+
+
+def intersection(children: list[Bounds]) -> Bounds:
+    return Bounds(
+            max(b.left for b in children), min(b.right for b in children),
+            max(b.back for b in children), min(b.front for b in children),
+            max(b.bottom for b in children), min(b.top for b in children),
+            )
+
+
+def _cos_sin(angle: float):
+    # exact values for right angles, so that axis-aligned rotations do not pick up rounding noise
+    exact = {0: (1, 0), 90: (0, 1), 180: (-1, 0), 270: (0, -1)}
+    if angle in exact:
+        return exact[angle]
+    return math.cos(math.radians(angle)), math.sin(math.radians(angle))
+
+
+def _rotate_plane(a_lo, a_hi, b_lo, b_hi, angle):
+    # bounds of the rectangle [a_lo, a_hi] x [b_lo, b_hi] rotated by `angle` from the a axis towards the b axis
+    if angle == 0:
+        return a_lo, a_hi, b_lo, b_hi
+    c, s = _cos_sin(angle)
+    a = [c*a_lo - s*b_lo, c*a_lo - s*b_hi, c*a_hi - s*b_lo, c*a_hi - s*b_hi]
+    b = [s*a_lo + c*b_lo, s*a_lo + c*b_hi, s*a_hi + c*b_lo, s*a_hi + c*b_hi]
+    return min(a), max(a), min(b), max(b)
+
+
+def _rotated(b: Bounds, x, y, z) -> Bounds:
+    # OpenSCAD applies rotate([x, y, z]) as x first, then y, then z
+    left, right, back, front, bottom, top = b.left, b.right, b.back, b.front, b.bottom, b.top
+    back, front, bottom, top = _rotate_plane(back, front, bottom, top, x)
+    bottom, top, left, right = _rotate_plane(bottom, top, left, right, y)
+    left, right, back, front = _rotate_plane(left, right, back, front, z)
+    return Bounds(left, right, back, front, bottom, top)
+
+
+def _mirrored(b: Bounds, x, y, z) -> Bounds:
+    if [bool(x), bool(y), bool(z)].count(True) > 1:
+        raise NotImplementedError("Only single axis mirror vectors are supported")
+    if x:
+        return dataclasses.replace(b, left=-b.right, right=-b.left)
+    if y:
+        return dataclasses.replace(b, back=-b.front, front=-b.back)
+    if z:
+        return dataclasses.replace(b, bottom=-b.top, top=-b.bottom)
+    return b
+
+
+def _scaled(b: Bounds, x, y, z) -> Bounds:
+    return from_points((px*x, py*y, pz*z) for px, py, pz in b.corners())
+
+
+def _from_properties(obj) -> Bounds:
+    return Bounds(*(getattr(obj, side) for side in SIDES))
+
+
+def _part(obj: Part) -> Bounds:
+    # parts like Volume define their own extents instead of deriving them from the children
+    if type(obj).left is not Part.left:
+        return _from_properties(obj)
+    return union([of(c) for c in obj.children])
+
+
+def _linear_extrusion(obj: LinearExtrusion) -> Bounds:
+    if obj._twist != 0:
+        raise NotImplementedError("Linear extrusion with 'twist' is not supported")
+    child = of(obj.child)
+    scale = obj._scale if isinstance(obj._scale, (tuple, list)) else (obj._scale, obj._scale)
+    flat = union([child, _scaled(child, scale[0], scale[1], 1)])
+    shift = -obj._height/2 if obj._center else 0
+    return dataclasses.replace(flat, bottom=child.bottom + shift, top=child.top + obj._height + shift)
+
+
+def _rotational_extrusion(obj: RotationalExtrusion) -> Bounds:
+    child = of(obj.child)
+    bottom, top = min(child.back, 0), max(child.front, 0)
+    if abs(obj.angle) >= 360:
+        r = max(child.right, -child.left)
+        return Bounds(-r, r, -r, r, bottom, top)
+    # the profile's x becomes the radius; OpenSCAD sweeps a profile on the negative side starting from -x
+    if child.right <= 0:
+        inner, outer, start = -child.right, -child.left, 180
+    else:
+        inner, outer, start = max(child.left, 0), child.right, 0
+    first, last = sorted((start, start + obj.angle))
+    # the sector reaches its extremes at the start and end of the sweep, and where it crosses an axis
+    angles = [first, last, *(a for a in range(-360, 720, 90) if first < a < last)]
+    swept = from_points((r*c, r*s, 0) for a in angles for c, s in [_cos_sin(a % 360)] for r in (inner, outer))
+    return dataclasses.replace(swept, bottom=bottom, top=top)
+
+
+_computations = {
+        Hole: lambda o: of(o.object),
+        Misc: lambda o: of(o.object),
+        Part: _part,
+        Union: lambda o: union([of(c) for c in o.children]),
+        Difference: lambda o: of(o.children[0]),
+        Intersection: lambda o: intersection([of(c) for c in o.children]),
+        Translation: lambda o: of(o.child).translated(o.x, o.y, o.z),
+        Rotation: lambda o: _rotated(of(o.child), o.x, o.y, o.z),
+        Mirroring: lambda o: _mirrored(of(o.child), o.x, o.y, o.z),
+        Scaling: lambda o: _scaled(of(o.child), o.x, o.y, o.z),
+        LinearExtrusion: _linear_extrusion,
+        RotationalExtrusion: _rotational_extrusion,
+        Color: lambda o: of(o.child),
+        Hull: lambda o: of(o.child),
+        Render: lambda o: of(o.child),
+        Slide: lambda o: of(o.child),
+        }
+
+
+def _compute(obj) -> Bounds:
+    for cls in type(obj).__mro__:
+        if cls in _computations:
+            return _computations[cls](obj)
+    return _from_properties(obj)
+
+
+def _stamp(obj):
+    # composites can still grow after they were measured (`union += ...`, `part.add_child(...)`)
+    if isinstance(obj, Composite):
+        return len(obj.children)
+    return None
+
+
+def of(obj) -> Bounds:
+    """
+    Axis-aligned bounds of a muscad object.
+
+    Each node is measured once from the cached bounds of its children, the result is stored on the node itself.
+    A node notices when it gets new children itself, but not when something below a direct child changes:
+    once a subtree is measured, only its root may still grow (`union += ...`, `part.add_child(...)`).
+    """
+    stamp = _stamp(obj)
+    # vars() instead of getattr(): transformations forward unknown attributes to their child
+    cached = vars(obj).get("_bounds")
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    result = _compute(obj)
+    vars(obj)["_bounds"] = (stamp, result)
+    return result
+
+
+def pin(obj, b: Bounds):
+    """Replace the measured bounds of `obj` with `b`."""
+    vars(obj)["_bounds"] = (_stamp(obj), b)
+    return obj
+
+
+def align(obj, *, left=None, center_x=None, right=None, back=None, center_y=None, front=None, bottom=None, center_z=None, top=None):
+    """Same as muscad's `Object.align`, but measuring `obj` through the bounds cache."""
+    b = of(obj)
+    x = y = z = 0
+    if left is not None:
+        x = left - b.left
+    elif center_x is not None:
+        x = center_x - b.center_x
+    elif right is not None:
+        x = right - b.right
+    if back is not None:
+        y = back - b.back
+    elif center_y is not None:
+        y = center_y - b.center_y
+    elif front is not None:
+        y = front - b.front
+    if bottom is not None:
+        z = bottom - b.bottom
+    elif center_z is not None:
+        z = center_z - b.center_z
+    elif top is not None:
+        z = top - b.top
+    return obj.translate(x=x, y=y, z=z)
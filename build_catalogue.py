@@ -0,0 +1,58 @@
+import argparse
+import json
+from pathlib import Path
+
+import catalogue
+import cmdline
+import model
+import parse
+
+# standard profile series (side length in mm) and their common corner radii
+# 20- and 30-series profiles are below the minimal cuff height of 40mm, so they are always generated live
+STANDARD_PROFILES = {
+        40.0: (1.5, 5.0, 10.0),
+        45.0: (1.5, 5.0, 10.0),
+        }
+
+STANDARD_PARAMETERS = [
+        {}, # the defaults of model.generate()
+        *({"width": size, "height": size, "corner_radius": r} for size, radii in STANDARD_PROFILES.items() for r in radii),
+        ]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="pre-generate SCAD and STL files for the standard parameter sets")
+    parser.add_argument("out", type=Path, nargs="?", default=Path(__file__).parent / "catalogue", help="catalogue directory to write to")
+    parser.add_argument("--backend", "-b", choices=["openscad", "manifold"], default="openscad", help="How meshes are generated, see cmdline.py")
+    return parser.parse_args()
+
+def build_entry(directory: Path, parameters: dict, backend: str) -> list[str]:
+    codes = model.generate(**parameters)
+    if backend == "openscad":
+        cmdline.write_openscad_meshes(directory, codes, "stl")
+    else:
+        cmdline.write_codes(directory, codes)
+        cmdline.write_manifold_meshes(directory, model.parts(**parameters), "stl")
+    return [name for name, _ in codes]
+
+def build(out: Path, backend: str, standard_parameters: list[dict] = STANDARD_PARAMETERS):
+    parameter_definitions = parse.parse_parameters(model.generate)
+    entries = {}
+    for standard in standard_parameters:
+        parameters = cmdline.check_parameters(parameter_definitions, {k: str(v) for k, v in standard.items()})
+        key = catalogue.canonical_key(parameters)
+        directory = catalogue.entry_directory(key)
+        parts = build_entry(out / directory, parameters, backend)
+        entries[key] = {"directory": directory, "parameters": parameters, "parts": parts}
+        print(f"{key} -> {directory}")
+
+    index = {"model_version": catalogue.model_version(backend), "backend": backend, "entries": entries}
+    with open(out / catalogue.INDEX_NAME, "w") as f:
+        json.dump(index, f, indent=1)
+
+def main():
+    args = parse_args()
+    build(args.out, args.backend)
+
+
+if __name__ == "__main__":
+    main()
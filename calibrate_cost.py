@@ -0,0 +1,147 @@
+import argparse
+import json
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+import build_catalogue
+import cmdline
+import cost
+import model
+import parse
+
+# records render timings and fits the coefficients of cost.py to them
+
+# the standard sets and the combinations known to be slow
+CALIBRATION_PARAMETERS = [
+        *build_catalogue.STANDARD_PARAMETERS,
+        {"height_offset": 2.5},
+        {"fill_bottom": "none"},
+        {"height_offset": 2.5, "fill_bottom": "none"},
+        {"width": 90.0, "height": 60.0, "corner_radius": 25.0, "height_offset": 5.0},
+        ]
+
+SECONDS_FEATURES = ["constant", "nodes", "boolean_depth", "boolean_facets", "segments", "fasteners"]
+TRIANGLES_FEATURES = ["facets"]
+
+# the raw timings are machine specific and only needed for refitting, so they are kept out of the calibration file
+SAMPLES_FILE = Path(__file__).parent / "cost_samples.json"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="time the rendering of all parts and fit the cost model to it")
+    parser.add_argument("--backend", "-b", choices=["openscad", "manifold", "wasm"], default="manifold", help="How meshes are generated, see cmdline.py; 'wasm' is openscad-wasm as used by the web customizer, run through node")
+    parser.add_argument("--repeat", type=int, default=1, help="render each part this many times and keep the fastest run")
+    parser.add_argument("--out", type=Path, default=cost.CALIBRATION_FILE, help="calibration file to update")
+    parser.add_argument("--samples", type=Path, default=SAMPLES_FILE, help="file to store the recorded timings in")
+    return parser.parse_args()
+
+
+def render_manifold(part) -> int:
+    import mesh
+    return mesh.to_manifold(part).num_tri()
+
+def render_openscad(part) -> int:
+    with tempfile.TemporaryDirectory() as directory:
+        scad = Path(directory) / "part.scad"
+        stl = Path(directory) / "part.stl"
+        scad.write_text(str(part))
+        subprocess.run(["openscad", "--enable=manifold", "-o", stl, scad], check=True, capture_output=True)
+        return stl.read_text().count("endfacet")
+
+def render_wasm(part) -> tuple[float, int]:
+    with tempfile.TemporaryDirectory() as directory:
+        scad = Path(directory) / "part.scad"
+        scad.write_text(str(part))
+        result = subprocess.run(["node", Path(__file__).parent / "render_wasm.mjs", scad], check=True, capture_output=True, text=True)
+        measured = json.loads(result.stdout)
+        return measured["seconds"], measured["triangles"]
+
+def timed(render):
+    def run(part) -> tuple[float, int]:
+        start = time.perf_counter()
+        triangles = render(part)
+        return time.perf_counter() - start, triangles
+    return run
+
+def record(backend: str, repeat: int) -> list[dict]:
+    # node needs a while to start, so render_wasm.mjs measures the time itself
+    render = {"manifold": timed(render_manifold), "openscad": timed(render_openscad), "wasm": render_wasm}[backend]
+    parameter_definitions = parse.parse_parameters(model.generate)
+    samples = []
+    for standard in CALIBRATION_PARAMETERS:
+        parameters = cmdline.check_parameters(parameter_definitions, {k: str(v) for k, v in standard.items()})
+        for quality, factor in cost.QUALITY_LEVELS.items():
+            for i, (name, _) in enumerate(model.parts(**parameters)):
+                timings = []
+                for _ in range(repeat):
+                    # parts are rendered from fresh trees, rendering modifies them
+                    part = model.parts(**parameters)[i][1]
+                    cost.reduce_segments(part, factor)
+                    seconds, triangles = render(part)
+                    timings.append(seconds)
+                if triangles == 0:
+                    raise RuntimeError(f"{name} {parameters} rendered to an empty mesh in {quality} quality")
+                sample = {"part": name, "parameters": parameters, "quality": quality, "features": cost.measure(part).values(), "seconds": min(timings), "triangles": triangles}
+                print(f"{name} {quality} {parameters}: {sample['seconds']:.3f}s, {triangles} triangles")
+                samples.append(sample)
+    return samples
+
+
+def nnls(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Non-negative least squares, Lawson and Hanson's active set method."""
+    n = a.shape[1]
+    x = np.zeros(n)
+    passive = np.zeros(n, dtype=bool)
+    for _ in range(3 * n):
+        gradient = a.T @ (b - a @ x)
+        if passive.all() or gradient[~passive].max() <= 1e-10:
+            break
+        passive[np.argmax(np.where(passive, -np.inf, gradient))] = True
+        while True:
+            z = np.zeros(n)
+            z[passive] = np.linalg.lstsq(a[:, passive], b, rcond=None)[0]
+            if z[passive].min() > 0:
+                x = z
+                break
+            # move towards z until the first coefficient reaches zero, then drop it
+            blocking = passive & (z <= 0)
+            x = x + np.min(x[blocking] / (x[blocking] - z[blocking])) * (z - x)
+            passive &= x > 1e-12
+    return x
+
+
+def fit(samples: list[dict], target: str, features: list[str]) -> dict[str, float]:
+    a = np.array([[1.0 if f == "constant" else s["features"][f] for f in features] for s in samples], dtype=float)
+    b = np.array([s[target] for s in samples], dtype=float)
+    # the features are of very different magnitude, normalize them for the tolerances of nnls()
+    scale = np.linalg.norm(a, axis=0)
+    scale[scale == 0] = 1.0
+    coefficients = nnls(a / scale, b) / scale
+    return {f: float(c) for f, c in zip(features, coefficients) if c > 0}
+
+
+def main():
+    args = parse_args()
+    samples = record(args.backend, args.repeat)
+    with open(args.samples, "w") as f:
+        json.dump(samples, f, indent=1)
+    try:
+        with open(args.out) as f:
+            calibration = json.load(f)
+    except FileNotFoundError:
+        calibration = {}
+    calibration[args.backend] = {
+            "seconds": fit(samples, "seconds", SECONDS_FEATURES),
+            "triangles": fit(samples, "triangles", TRIANGLES_FEATURES),
+            }
+    with open(args.out, "w") as f:
+        json.dump(calibration, f, indent=1)
+    print(json.dumps(calibration[args.backend], indent=1))
+
+
+if __name__ == "__main__":
+    main()
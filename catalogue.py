@@ -0,0 +1,67 @@
+import functools
+import hashlib
+import importlib.metadata
+import json
+from pathlib import Path
+
+import bounds
+import model
+
+# pre-generated parts for standard parameter sets, see build_catalogue.py
+# this module is also used by the web customizer, so it must not depend on anything besides the model
+
+INDEX_NAME = "index.json"
+
+# file extension of each format stored in the catalogue, keyed like the formats of cmdline.py
+FORMATS = {
+        "openscad": "scad",
+        "stl": "stl",
+        }
+
+
+def canonical_key(parameters: dict) -> str:
+    """Key of a complete, type-checked set of generator parameters."""
+    items = []
+    for name, value in sorted(parameters.items()):
+        if isinstance(value, float):
+            value += 0.0 # -0.0 and 0.0 generate the same parts
+        items.append(f"{name}={value}")
+    return ",".join(items)
+
+
+@functools.cache
+def model_version(backend: str) -> str:
+    # entries are only valid for the model and the mesh pipeline they were generated with
+    h = hashlib.sha256(backend.encode())
+    sources = [Path(model.__file__), Path(bounds.__file__)]
+    if backend == "manifold":
+        # only hashed, not imported: the web customizer has no manifold3d
+        sources.append(Path(model.__file__).with_name("mesh.py"))
+    for source in sources:
+        h.update(source.read_bytes())
+    for package in ("muscad", "muscad_tools"):
+        h.update(importlib.metadata.version(package).encode())
+    return h.hexdigest()
+
+
+def entry_directory(key: str) -> str:
+    return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+
+def load_index(catalogue: Path) -> dict | None:
+    try:
+        with open(catalogue / INDEX_NAME) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def lookup(index: dict | None, parameters: dict) -> dict | None:
+    # indices from before the backend was recorded can not be checked against the mesh pipeline
+    if index is None or "backend" not in index or index["model_version"] != model_version(index["backend"]):
+        return None
+    return index["entries"].get(canonical_key(parameters))
+
+
+def part_file(entry: dict, name: str, format: str) -> str:
+    return f"{entry['directory']}/{name}.{FORMATS[format]}"
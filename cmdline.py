@@ -1,14 +1,32 @@
 import argparse
+import concurrent.futures
+import importlib
+import importlib.util
 import re
+import shutil
+import subprocess
+import sys
+import time
+import traceback
+import types
 from pathlib import Path
 
+import catalogue
+import cost
 import model
 import parse
 
 def parse_args():
     parser = argparse.ArgumentParser()
     parser.add_argument("out", type=Path, help="file to write to")
-    parser.add_argument("--format", "-f", choices=["openscad"], default="openscad", help="Output format")
+    parser.add_argument("--format", "-f", choices=["openscad", "stl", "3mf"], default="openscad", help="Output format")
+    parser.add_argument("--backend", "-b", choices=["openscad", "manifold"], default="openscad", help="How meshes are generated: by running OpenSCAD on the generated code, or directly with manifold3d")
+    parser.add_argument("--catalogue", type=Path, default=Path(__file__).parent / "catalogue", help="pre-generated parts for standard parameter sets, see build_catalogue.py")
+    parser.add_argument("--quality", "-q", choices=["auto", *cost.QUALITY_LEVELS], default="full", help="resolution of round objects, 'auto' picks the best one that fits into --time-budget")
+    parser.add_argument("--time-budget", type=float, default=10.0, help="estimated render time in seconds that '--quality auto' aims for")
+    parser.add_argument("--max-time", type=float, default=None, help="refuse parameters whose estimated render time in seconds exceeds this")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="number of parts rendered in parallel, the slowest ones are started first")
+    parser.add_argument("--watch", "-w", action="store_true", help="keep running and regenerate the changed parts whenever the model sources change")
     parser.add_argument("parameters", type=str, nargs="*", help="parameters in 'key=value' format")
     return parser.parse_args()
 
@@ -41,7 +59,7 @@ def check_parameters(parameter_definitions: list[parse.Parameter], parameters: d
         try:
             value = parameters[p.name]
         except KeyError:
-            if p.default:
+            if p.default is not None:
                 value = p.default
             else:
                 raise RuntimeError(f"mandatory value for '{p.name}=' not given on command line") from None
@@ -49,23 +67,147 @@ def check_parameters(parameter_definitions: list[parse.Parameter], parameters: d
         result[p.name] = value
     return result
 
-def write_codes(out: Path, codes):
+def prepare_output_dir(out: Path):
     if not out.exists():
         out.mkdir(parents=True)
     if not out.is_dir():
         raise RuntimeError(f"{out} is not a directory")
+
+def write_codes(out: Path, codes):
+    prepare_output_dir(out)
     for name, code in codes:
-        with open(out / f"{name}.scad", "w") as f:
+        path = out / f"{name}.scad"
+        # leave unchanged files alone, so OpenSCAD's auto-reload only triggers on real changes
+        if path.exists() and path.read_text() == code:
+            continue
+        with open(path, "w") as f:
             f.write(code)
 
+def run_parallel(function, items, jobs: int):
+    # items are started in the given order, so pass the slowest ones first
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+        for _ in executor.map(function, items):
+            pass
+
+def write_openscad_meshes(out: Path, codes, format: str, jobs: int = 1):
+    write_codes(out, codes)
+    run_parallel(lambda name: subprocess.run(["openscad", "--enable=manifold", "-o", out / f"{name}.{format}", out / f"{name}.scad"], check=True), [name for name, _ in codes], jobs)
+
+def write_manifold_meshes(out: Path, parts, format: str, jobs: int = 1):
+    # manifold3d is only needed for this backend, so it is not part of requirements.txt
+    import mesh
+    prepare_output_dir(out)
+    writer = {"stl": mesh.write_stl, "3mf": mesh.write_3mf}[format]
+    run_parallel(lambda item: writer(out / f"{item[0]}.{format}", mesh.to_manifold(item[1])), list(parts), jobs)
+
+
+def copy_from_catalogue(catalogue_dir: Path, entry: dict, out: Path, format: str):
+    prepare_output_dir(out)
+    for name in entry["parts"]:
+        shutil.copyfile(catalogue_dir / catalogue.part_file(entry, name, format), out / f"{name}.{catalogue.FORMATS[format]}")
+
+
+def plan_parts(args, checked_parameters: dict) -> tuple[str, list]:
+    """Builds the parts in the requested quality, ordered by their estimated render time, slowest first, and returns the chosen quality with them."""
+    calibration = cost.load_calibration(args.backend)
+    quality, parts, estimates = cost.plan(lambda: model.parts(**checked_parameters), calibration, args.quality, args.jobs, args.time_budget, args.max_time)
+    if args.quality == "auto":
+        print(f"quality: {quality}")
+    for name in cost.longest_first(estimates):
+        print(f"{name}: estimated {estimates[name].seconds:.1f}s, {estimates[name].triangles} triangles")
+    return quality, parts
+
+
+# local modules in import order; in watch mode, they are reloaded when they or one of their imports change
+WATCHED_MODULES = ["util", "parse", "bounds", "model", "catalogue", "mesh", "cost"]
+
+def watched_files() -> dict[str, int]:
+    return {name: Path(sys.modules[name].__file__).stat().st_mtime_ns for name in WATCHED_MODULES if name in sys.modules}
+
+def depends_on(module: types.ModuleType, names: set[str]) -> bool:
+    # covers both `import model` and `from model import OverriddenBounding`
+    for value in vars(module).values():
+        if isinstance(value, types.ModuleType) and value.__name__ in names:
+            return True
+        if getattr(value, "__module__", None) in names:
+            return True
+    return False
+
+def reload_modules(changed: set[str]) -> set[str]:
+    reloaded = set()
+    for name in WATCHED_MODULES:
+        if name not in sys.modules:
+            continue
+        if name in changed or depends_on(sys.modules[name], reloaded):
+            # the cached bytecode is only checked against the source's size and mtime in whole seconds,
+            # so a quick second save could otherwise reload the previous version
+            Path(importlib.util.cache_from_source(sys.modules[name].__file__)).unlink(missing_ok=True)
+            importlib.reload(sys.modules[name])
+            reloaded.add(name)
+    return reloaded
+
+def wait_for_changes(files: dict[str, int], interval: float = 0.5) -> set[str]:
+    while True:
+        time.sleep(interval)
+        current = watched_files()
+        changed = {name for name, mtime in current.items() if files.get(name) != mtime}
+        if changed:
+            return changed
+
+def regenerate_changed(args, cmdline_parameters: dict[str, str], previous_codes: dict[str, str]) -> dict[str, str]:
+    checked_parameters = check_parameters(parse.parse_parameters(model.generate), cmdline_parameters)
+    _, parts = plan_parts(args, checked_parameters)
+    codes = {name: str(part) for name, part in parts}
+    changed = [name for name, code in codes.items() if previous_codes.get(name) != code]
+    print(f"changed parts: {', '.join(changed) or 'none'}")
+    if args.format == "openscad":
+        write_codes(args.out, [(name, codes[name]) for name in changed])
+    elif args.backend == "openscad":
+        write_openscad_meshes(args.out, [(name, codes[name]) for name in changed], args.format, args.jobs)
+    else:
+        write_manifold_meshes(args.out, [(name, part) for name, part in parts if name in changed], args.format, args.jobs)
+    return codes
+
+def watch(args, cmdline_parameters: dict[str, str]):
+    codes = {}
+    while True:
+        files = watched_files()
+        try:
+            codes = regenerate_changed(args, cmdline_parameters, codes)
+        except Exception:
+            # keep running through half-edited sources, the next change will retry
+            traceback.print_exc()
+        changed = wait_for_changes(files)
+        try:
+            print(f"reloading {', '.join(sorted(reload_modules(changed)))}")
+        except Exception:
+            traceback.print_exc()
+
 
 def main():
     args = parse_args()
     cmdline_parameters = parse_cmdline_params(args)
+    if args.watch:
+        try:
+            watch(args, cmdline_parameters)
+        except KeyboardInterrupt:
+            pass
+        return
     generator_parameters = parse.parse_parameters(model.generate)
     checked_parameters = check_parameters(generator_parameters, cmdline_parameters)
-    codes: list[tuple[str, str]] = model.generate(**checked_parameters)
-    write_codes(args.out, codes)
+    # estimates are checked before anything is written
+    quality, parts = plan_parts(args, checked_parameters)
+    # the catalogue only holds full quality, so it is not used if a lower one was asked for or had to be chosen
+    entry = catalogue.lookup(catalogue.load_index(args.catalogue), checked_parameters) if quality == "full" else None
+    if entry is not None and args.format in catalogue.FORMATS:
+        copy_from_catalogue(args.catalogue, entry, args.out, args.format)
+        return
+    if args.format == "openscad":
+        write_codes(args.out, [(name, str(part)) for name, part in parts])
+    elif args.backend == "openscad":
+        write_openscad_meshes(args.out, [(name, str(part)) for name, part in parts], args.format, args.jobs)
+    else:
+        write_manifold_meshes(args.out, parts, args.format, args.jobs)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,252 @@
+import dataclasses
+import json
+import math
+from pathlib import Path
+
+from muscad import Cube, Cylinder, Sphere, Circle, Square, Polygon, Text, Union, Difference, Intersection, Part, Hole, Misc, Translation, Rotation, Mirroring, Scaling, Color, LinearExtrusion, RotationalExtrusion, Hull
+from muscad.base import Composite, Transformation, Slide
+from muscad.transformations import Render
+from muscad_tools import screws
+
+from model import OverriddenBounding
+
+# predicts how expensive a part is to render from its muscad tree, before OpenSCAD or manifold3d are started
+# the coefficients are fitted to recorded timings by calibrate_cost.py
+
+CALIBRATION_FILE = Path(__file__).parent / "cost_calibration.json"
+
+# factor on the number of segments of all round primitives and rotational extrusions
+QUALITY_LEVELS = {
+        "full": 1.0,
+        "normal": 0.5,
+        "draft": 0.25,
+        }
+
+# rounder objects stop looking round below this
+MIN_SEGMENTS = 8
+
+
+@dataclasses.dataclass
+class Features:
+    nodes: int = 0
+    fasteners: int = 0
+    booleans: int = 0 # number of boolean operations
+    boolean_depth: int = 0
+    boolean_facets: int = 0 # facets of all operands of all boolean operations, i.e. the work done by the CSG kernel
+    segments: int = 0 # segments of all extrusions
+    facets: int = 0 # facets of the result if nothing is cut away, outline edges for 2D objects
+
+    def values(self) -> dict[str, float]:
+        return dataclasses.asdict(self)
+
+
+@dataclasses.dataclass(frozen=True)
+class Estimate:
+    seconds: float
+    triangles: int
+
+
+@dataclasses.dataclass(frozen=True)
+class Calibration:
+    # linear models over the fields of Features, "constant" is the intercept
+    seconds: dict[str, float]
+    triangles: dict[str, float]
+
+    def estimate(self, features: Features) -> Estimate:
+        values = {"constant": 1.0, **features.values()}
+        seconds = sum(c * values[name] for name, c in self.seconds.items())
+        triangles = sum(c * values[name] for name, c in self.triangles.items())
+        return Estimate(seconds=max(seconds, 0.0), triangles=max(round(triangles), 0))
+
+
+def _combined(children: list[Features], boolean: bool) -> Features:
+    result = Features(nodes=1)
+    for c in children:
+        result.nodes += c.nodes
+        result.fasteners += c.fasteners
+        result.booleans += c.booleans
+        result.boolean_depth = max(result.boolean_depth, c.boolean_depth)
+        result.boolean_facets += c.boolean_facets
+        result.segments += c.segments
+        result.facets += c.facets
+    if boolean and len(children) > 1:
+        result.booleans += len(children) - 1
+        result.boolean_depth += 1
+        result.boolean_facets += result.facets
+    return result
+
+
+def _leaf(facets: int) -> Features:
+    return Features(nodes=1, facets=facets)
+
+
+def _wrapped(child: Features, **changes) -> Features:
+    return dataclasses.replace(child, nodes=child.nodes+1, **changes)
+
+
+def _fragments(segments, angle=360.0) -> int:
+    # like OpenSCAD, $fn < 3 falls back to its own resolution, which is coarser than anything used in the model
+    segments = segments if segments >= 3 else MIN_SEGMENTS
+    return max(math.ceil(segments * abs(angle) / 360.0), 1)
+
+
+def _part(obj: Part) -> Features:
+    result = _combined([measure(c) for c in (*obj.children, *obj.miscellaneous)], boolean=True)
+    if obj.holes:
+        result = _combined([result, *(measure(h) for h in obj.holes)], boolean=True)
+    if isinstance(obj, (screws.Screw, screws.Nut934)):
+        result.fasteners += 1
+    return result
+
+
+def _linear_extrusion(obj: LinearExtrusion) -> Features:
+    child = measure(obj.child)
+    slices = obj._slices or 1
+    # the outline becomes the walls of each slice, the caps are triangulated
+    return _wrapped(child, segments=child.segments+slices, facets=2*child.facets*slices + 2*child.facets)
+
+
+def _rotational_extrusion(obj: RotationalExtrusion) -> Features:
+    child = measure(obj.child)
+    segments = _fragments(obj.segments, obj.angle)
+    return _wrapped(child, segments=child.segments+segments, facets=2*child.facets*segments + 2*child.facets)
+
+
+_measurements = {
+        Hole: lambda o: measure(o.object),
+        Misc: lambda o: measure(o.object),
+        OverriddenBounding: lambda o: measure(o.child),
+        Part: _part,
+        Union: lambda o: _combined([measure(c) for c in o.children], boolean=True),
+        Difference: lambda o: _combined([measure(c) for c in o.children], boolean=True),
+        Intersection: lambda o: _combined([measure(c) for c in o.children], boolean=True),
+        Cube: lambda o: _leaf(12),
+        Cylinder: lambda o: _leaf(4*_fragments(o.segments)),
+        Sphere: lambda o: _leaf(_fragments(o._segments)**2),
+        Circle: lambda o: _leaf(_fragments(o._segments)),
+        Square: lambda o: _leaf(4),
+        Polygon: lambda o: _leaf(len(o.points)),
+        Text: lambda o: _leaf(100*len(o.text)),
+        Translation: lambda o: _wrapped(measure(o.child)),
+        Rotation: lambda o: _wrapped(measure(o.child)),
+        Mirroring: lambda o: _wrapped(measure(o.child)),
+        Scaling: lambda o: _wrapped(measure(o.child)),
+        LinearExtrusion: _linear_extrusion,
+        RotationalExtrusion: _rotational_extrusion,
+        Color: lambda o: _wrapped(measure(o.child)),
+        Render: lambda o: _wrapped(measure(o.child)),
+        Slide: lambda o: _wrapped(measure(o.child)),
+        Hull: lambda o: _combined([measure(o.child)], boolean=False),
+        }
+
+
+def measure(obj) -> Features:
+    # disabled (*) and background (%) objects are not rendered, so they cost nothing
+    if getattr(obj, "modifier", "") in ("*", "%"):
+        return Features()
+    for cls in type(obj).__mro__:
+        if cls in _measurements:
+            return _measurements[cls](obj)
+    raise NotImplementedError(f"no cost model for {type(obj).__name__}")
+
+
+# attribute holding the number of segments, per class
+_segment_attributes = {
+        Cylinder: "segments",
+        RotationalExtrusion: "segments",
+        Sphere: "_segments",
+        Circle: "_segments",
+        }
+
+
+def _subtrees(obj) -> list:
+    if isinstance(obj, Part):
+        return [*obj.children, *obj.miscellaneous, *obj.holes]
+    if isinstance(obj, (Hole, Misc)):
+        return [obj.object]
+    if isinstance(obj, Composite):
+        return obj.children
+    if isinstance(obj, (Transformation, OverriddenBounding)):
+        return [obj.child]
+    return []
+
+
+def reduce_segments(obj, factor: float):
+    """Scales the segments of all round objects below obj in place, down to MIN_SEGMENTS."""
+    seen = set()
+    pending = [obj]
+    while pending:
+        o = pending.pop()
+        # subtrees are shared, e.g. by `c + c.y_mirror()`
+        if id(o) in seen:
+            continue
+        seen.add(id(o))
+        for cls, attribute in _segment_attributes.items():
+            if isinstance(o, cls):
+                segments = getattr(o, attribute)
+                if segments > MIN_SEGMENTS:
+                    setattr(o, attribute, max(round(segments * factor), MIN_SEGMENTS))
+        pending.extend(_subtrees(o))
+
+
+def calibration_from_dict(data: dict, backend: str) -> Calibration | None:
+    # timings of one renderer say little about another one, so a backend without its own is not estimated at all
+    if backend not in data:
+        return None
+    return Calibration(seconds=data[backend]["seconds"], triangles=data[backend]["triangles"])
+
+
+def load_calibration(backend: str, path: Path = CALIBRATION_FILE) -> Calibration | None:
+    try:
+        with open(path) as f:
+            return calibration_from_dict(json.load(f), backend)
+    except FileNotFoundError:
+        return None
+
+
+def estimate_parts(parts, calibration: Calibration) -> dict[str, Estimate]:
+    return {name: calibration.estimate(measure(part)) for name, part in parts}
+
+
+def longest_first(estimates: dict[str, Estimate]) -> list[str]:
+    return sorted(estimates, key=lambda name: estimates[name].seconds, reverse=True)
+
+
+def makespan(estimates: dict[str, Estimate], workers: int) -> float:
+    """Estimated wall time if the parts are handed out longest first to the given number of workers."""
+    finished = [0.0] * max(workers, 1)
+    for name in longest_first(estimates):
+        finished[finished.index(min(finished))] += estimates[name].seconds
+    return max(finished)
+
+
+def plan(build, calibration: Calibration | None, quality: str = "full", workers: int = 1, budget: float | None = None, limit: float | None = None):
+    """
+    Builds the parts and estimates their render time, without rendering anything.
+    :param build: returns a fresh list of (name, part), e.g. `lambda: model.parts(**parameters)`
+    :param calibration: None if there is none for the renderer, then only fixed quality levels without limit are possible
+    :param quality: one of QUALITY_LEVELS, or "auto" for the best level whose estimated wall time fits into budget
+    :param limit: maximal estimated wall time, exceeding it raises a RuntimeError
+    :return: the chosen quality, the parts ordered slowest first, and their estimates (empty without calibration)
+    """
+    if calibration is None:
+        if quality == "auto" or limit is not None:
+            raise RuntimeError("render time can not be estimated without a calibration for this renderer, see calibrate_cost.py")
+        parts = build()
+        for _, part in parts:
+            reduce_segments(part, QUALITY_LEVELS[quality])
+        return quality, parts, {}
+    levels = list(QUALITY_LEVELS) if quality == "auto" else [quality]
+    for level in levels:
+        parts = build()
+        for _, part in parts:
+            reduce_segments(part, QUALITY_LEVELS[level])
+        estimates = estimate_parts(parts, calibration)
+        wall_time = makespan(estimates, workers)
+        if budget is None or wall_time <= budget:
+            break
+    if limit is not None and wall_time > limit:
+        raise RuntimeError(f"estimated render time of {wall_time:.1f}s exceeds the limit of {limit:.1f}s")
+    parts = dict(parts)
+    return level, [(name, parts[name]) for name in longest_first(estimates)], estimates
+
@@ -0,0 +1,196 @@
+import zipfile
+from pathlib import Path
+
+import numpy as np
+from manifold3d import Manifold, CrossSection, OpType, FillRule
+from muscad import Cube, Cylinder, Sphere, Circle, Square, Polygon, Union, Difference, Intersection, Part, Hole, Misc, Translation, Rotation, Mirroring, Scaling, Color, LinearExtrusion, RotationalExtrusion, Hull
+from muscad.transformations import Render
+
+from model import OverriddenBounding
+
+# compiles muscad trees straight into manifold3d geometry, without the detour over SCAD code and OpenSCAD
+
+Geometry = Manifold | CrossSection
+
+
+def _segments(n) -> int:
+    # OpenSCAD falls back to its own resolution for $fn < 3, manifold does the same for 0
+    return n if n >= 3 else 0
+
+
+def _combine(children: list[Geometry | None], op: OpType) -> Geometry | None:
+    children = [c for c in children if c is not None]
+    if not children:
+        return None
+    if isinstance(children[0], CrossSection):
+        # like OpenSCAD, ignore 3D objects inside 2D operations and vice versa
+        return CrossSection.batch_boolean([c for c in children if isinstance(c, CrossSection)], op)
+    return Manifold.batch_boolean([c for c in children if isinstance(c, Manifold)], op)
+
+
+def _difference(children: list[Geometry | None]) -> Geometry | None:
+    if children[0] is None:
+        return None
+    return _combine(children, OpType.Subtract)
+
+
+def _part(obj: Part) -> Geometry | None:
+    # same composition as Part.render(), but built from fresh nodes: Part.render() extends the first child in place
+    renderable = Union(*obj.children, *obj.miscellaneous)
+    if obj.holes:
+        renderable = Difference(renderable, *obj.holes)
+    return convert(obj.postprocess(renderable))
+
+
+def _cylinder(obj: Cylinder) -> Manifold:
+    d2 = obj.diameter if obj.diameter2 is None else obj.diameter2
+    return Manifold.cylinder(obj.height, obj.diameter/2, d2/2, _segments(obj.segments), center=True)
+
+
+def _polygon(obj: Polygon) -> CrossSection:
+    points = [(p.x, p.y) for p in obj.points]
+    if obj.paths is None:
+        return CrossSection([points], FillRule.EvenOdd)
+    return CrossSection([[points[i] for i in path] for path in obj.paths], FillRule.EvenOdd)
+
+
+def _transformed(obj, flat, solid) -> Geometry | None:
+    child = convert(obj.child)
+    if child is None:
+        return None
+    if isinstance(child, CrossSection):
+        return flat(child)
+    return solid(child)
+
+
+def _rotate_flat(obj: Rotation, child: CrossSection) -> CrossSection:
+    if obj.x or obj.y:
+        raise NotImplementedError("2D objects can only be rotated around the z axis")
+    return child.rotate(obj.z)
+
+
+def _linear_extrusion(obj: LinearExtrusion) -> Manifold | None:
+    if obj._twist != 0:
+        raise NotImplementedError("Linear extrusion with 'twist' is not supported")
+    child = convert(obj.child)
+    # OpenSCAD drops degenerate extrusions, manifold would turn them into an invalid result that spreads through every boolean
+    if child is None or child.is_empty() or obj._height <= 0:
+        return None
+    scale = obj._scale if isinstance(obj._scale, (tuple, list)) else (obj._scale, obj._scale)
+    result = Manifold.extrude(child, obj._height, n_divisions=obj._slices or 0, scale_top=scale)
+    if obj._center:
+        result = result.translate((0, 0, -obj._height/2))
+    return result
+
+
+def _rotational_extrusion(obj: RotationalExtrusion) -> Manifold | None:
+    child = convert(obj.child)
+    if child is None or child.is_empty() or obj.angle == 0:
+        return None
+    segments = _segments(obj.segments)
+    min_x, _, max_x, _ = child.bounds()
+    if min_x < 0 < max_x:
+        raise RuntimeError("all points for rotate_extrude() must have the same X coordinate sign")
+    if max_x <= 0:
+        # OpenSCAD sweeps a profile on the negative side starting from -x, manifold only revolves the positive side
+        return Manifold.revolve(child.mirror((1, 0)), segments, obj.angle).rotate((0, 0, 180))
+    return Manifold.revolve(child, segments, obj.angle)
+
+
+_converters = {
+        Hole: lambda o: convert(o.object),
+        Misc: lambda o: convert(o.object),
+        OverriddenBounding: lambda o: convert(o.child),
+        Part: _part,
+        Union: lambda o: _combine([convert(c) for c in o.children], OpType.Add),
+        Difference: lambda o: _difference([convert(c) for c in o.children]),
+        Intersection: lambda o: _combine([convert(c) for c in o.children], OpType.Intersect),
+        Cube: lambda o: Manifold.cube((o.width, o.depth, o.height), center=True),
+        Cylinder: _cylinder,
+        Sphere: lambda o: Manifold.sphere(o.width/2, _segments(o._segments)),
+        Circle: lambda o: CrossSection.circle(o._diameter/2, _segments(o._segments)),
+        Square: lambda o: CrossSection.square((o.width, o.depth), center=True),
+        Polygon: _polygon,
+        Translation: lambda o: _transformed(o, lambda c: c.translate((o.x, o.y)), lambda c: c.translate((o.x, o.y, o.z))),
+        Rotation: lambda o: _transformed(o, lambda c: _rotate_flat(o, c), lambda c: c.rotate((o.x, o.y, o.z))),
+        Mirroring: lambda o: _transformed(o, lambda c: c.mirror((o.x, o.y)), lambda c: c.mirror((o.x, o.y, o.z))),
+        Scaling: lambda o: _transformed(o, lambda c: c.scale((o.x, o.y)), lambda c: c.scale((o.x, o.y, o.z))),
+        LinearExtrusion: _linear_extrusion,
+        RotationalExtrusion: _rotational_extrusion,
+        Color: lambda o: convert(o.child),
+        Render: lambda o: convert(o.child),
+        Hull: lambda o: _transformed(o, lambda c: c.hull(), lambda c: c.hull()),
+        }
+
+
+def convert(obj) -> Geometry | None:
+    # disabled (*) and background (%) objects are not part of the rendered result
+    if getattr(obj, "modifier", "") in ("*", "%"):
+        return None
+    for cls in type(obj).__mro__:
+        if cls in _converters:
+            return _converters[cls](obj)
+    raise NotImplementedError(f"no mesh conversion for {type(obj).__name__}")
+
+
+def to_manifold(obj) -> Manifold:
+    result = convert(obj)
+    if not isinstance(result, Manifold):
+        raise RuntimeError(f"{type(obj).__name__} does not describe a 3D object")
+    if result.status().name != "NoError":
+        raise RuntimeError(f"{type(obj).__name__} did not result in a valid mesh: {result.status().name}")
+    return result
+
+
+def _triangles(manifold: Manifold):
+    m = manifold.to_mesh()
+    return np.asarray(m.vert_properties[:, :3], dtype=np.float32), np.asarray(m.tri_verts, dtype=np.uint32)
+
+
+def write_stl(path: Path, manifold: Manifold):
+    vertices, triangles = _triangles(manifold)
+    corners = vertices[triangles]
+    normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    normals = np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0)
+
+    records = np.zeros(len(triangles), dtype=[("normal", "<f4", 3), ("corners", "<f4", (3, 3)), ("attribute", "<u2")])
+    records["normal"] = normals
+    records["corners"] = corners
+    with open(path, "wb") as f:
+        f.write(b"cuffs".ljust(80, b"\0"))
+        f.write(np.uint32(len(triangles)).tobytes())
+        f.write(records.tobytes())
+
+
+_3mf_content_types = """<?xml version="1.0" encoding="UTF-8"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+ <Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+ <Default Extension="model" ContentType="application/vnd.ms-package.3dmanufacturing-3dmodel+xml"/>
+</Types>
+"""
+
+_3mf_relationships = """<?xml version="1.0" encoding="UTF-8"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+ <Relationship Target="/3D/3dmodel.model" Id="rel0" Type="http://schemas.microsoft.com/3dmanufacturing/2013/01/3dmodel"/>
+</Relationships>
+"""
+
+
+def write_3mf(path: Path, manifold: Manifold):
+    vertices, triangles = _triangles(manifold)
+    model = [
+            '<?xml version="1.0" encoding="UTF-8"?>',
+            '<model unit="millimeter" xml:lang="en-US" xmlns="http://schemas.microsoft.com/3dmanufacturing/core/2015/02">',
+            '<resources><object id="1" type="model"><mesh><vertices>',
+            *(f'<vertex x="{x}" y="{y}" z="{z}"/>' for x, y, z in vertices.tolist()),
+            '</vertices><triangles>',
+            *(f'<triangle v1="{a}" v2="{b}" v3="{c}"/>' for a, b, c in triangles.tolist()),
+            '</triangles></mesh></object></resources>',
+            '<build><item objectid="1"/></build>',
+            '</model>',
+            ]
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as f:
+        f.writestr("[Content_Types].xml", _3mf_content_types)
+        f.writestr("_rels/.rels", _3mf_relationships)
+        f.writestr("3D/3dmodel.model", "\n".join(model))
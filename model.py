@@ -1,11 +1,13 @@
 import sys
 import math
 import dataclasses
+import inspect
 from typing import Literal
 
 from muscad import E, EE, T, TT, Cube, Volume, Cylinder, Part, Sphere, Circle, Square, Text, Polygon, Object, Union
 from muscad_tools import screws
 
+import bounds
 from util import InvalidParameterException
 
 
@@ -21,73 +23,38 @@ class RoundedRect(Part):
     def init(self, w, h, r):
         for x_s in (-1, 1):
             for y_s in (-1, 1):
-                self.add_child(Circle(d=2*r).align(center_x=x_s*(w/2-r), center_y=y_s*(h/2-r)))
+                self.add_child(bounds.align(Circle(d=2*r), center_x=x_s*(w/2-r), center_y=y_s*(h/2-r)))
         self.add_child(Square(w-2*r, h))
         self.add_child(Square(w, h-2*r))
 
-def exception_default(l, exception_type, default=None):
-    try:
-        return l()
-    except exception_type:
-        return default
-
-def property_if_available(obj, property_name: str):
-    return exception_default(lambda: getattr(obj, property_name), TypeError)
-
-
-def get_with_fallback(*args):
-    for arg in args:
-        if arg is not None:
-            return arg
-    return None
-
-
-def derive_dimension_parameter(child, prop: str, override: float):
-    return get_with_fallback(override, property_if_available(child, prop))
-
-
-
 class OverriddenBounding(Object):
-    def __init__(self, child, width=None, depth=None, height=None, left=None, right=None, front=None, back=None, top=None, bottom=None):
+    def __init__(self, child, left=None, right=None, front=None, back=None, top=None, bottom=None):
         self.child = child
-
-        self._left = derive_dimension_parameter(child, "left", left)
-        self._right = derive_dimension_parameter(child, "right", right)
-        self._back = derive_dimension_parameter(child, "back", back)
-        self._front = derive_dimension_parameter(child, "front", front)
-        self._top = derive_dimension_parameter(child, "top", top)
-        self._bottom = derive_dimension_parameter(child, "bottom", bottom)
-
-        assert self._left is not None
-        assert self._right is not None
-        assert self._back is not None
-        assert self._front is not None
-        assert self._top is not None
-        assert self._bottom is not None
+        bounds.pin(self, bounds.of(child).overridden(left=left, right=right, front=front, back=back, top=top, bottom=bottom))
 
     @property
     def left(self):
-        return self._left
+        return bounds.of(self).left
 
     @property
     def right(self):
-        return self._right
+        return bounds.of(self).right
 
     @property
     def back(self):
-        return self._back
+        return bounds.of(self).back
 
     @property
     def front(self):
-        return self._front
+        return bounds.of(self).front
 
     @property
     def top(self):
-        return self._top
+        return bounds.of(self).top
 
     @property
     def bottom(self):
-        return self._bottom
+        return bounds.of(self).bottom
 
     def render(self):
         return self.child.render()
@@ -108,11 +75,12 @@ def invert_hinge_info(i: HingeInfo):
 
 class Cuff(Part):
     def corner(self, rect: RoundedRect, corner_r):
-        size = (rect.depth+corner_r)
-        return OverriddenBounding(rect.align(back=corner_r).z_rotate(90).rotational_extrude(90.0, segments=100).y_rotate(-90).x_rotate(90), back=0, front=size, bottom=-size, top=0)
+        size = (bounds.of(rect).depth+corner_r)
+        return OverriddenBounding(bounds.align(rect, back=corner_r).z_rotate(90).rotational_extrude(90.0, segments=100).y_rotate(-90).x_rotate(90), back=0, front=size, bottom=-size, top=0)
     def round_end(self, rect: RoundedRect):
-        obj = (rect.z_rotate(90) - Square(rect.depth+EE, rect.width+EE).align(left=0)).rotational_extrude(360.0, segments=100).y_rotate(-90).x_rotate(90)
-        r = rect.depth/2
+        rect_bounds = bounds.of(rect)
+        obj = (rect.z_rotate(90) - bounds.align(Square(rect_bounds.depth+EE, rect_bounds.width+EE), left=0)).rotational_extrude(360.0, segments=100).y_rotate(-90).x_rotate(90)
+        r = rect_bounds.depth/2
         return OverriddenBounding(obj, back=-r, front=r, top=r, bottom=-r)
 
     def hinge_cutout(self, info: HingeInfo, length, thickness, cut_width):
@@ -120,7 +88,7 @@ class Cuff(Part):
         if info.style == "outer":
             cs = c
         elif info.style == "inner":
-            cs = c.align(right=length/2+E)
+            cs = bounds.align(c, right=length/2+E)
             cs += cs.x_mirror()
         else:
             raise NotImplementedError()
@@ -132,18 +100,18 @@ class Cuff(Part):
 
     def bottom_fill(self, width, length, corner_r, chamfer_r, thickness):
         base = Volume(width=length, depth=width+2*thickness, height=corner_r+thickness).fillet_height(chamfer_r)
-        c = Cylinder(d=corner_r*2+thickness, h=length+EE).y_rotate(90).align(center_z=base.top, front=width/2+thickness/2)
-        bottom = Volume(width=length+EE, depth=width-2*corner_r, height=corner_r+thickness/2).align(top=base.top+E)
+        c = bounds.align(Cylinder(d=corner_r*2+thickness, h=length+EE).y_rotate(90), center_z=base.top, front=width/2+thickness/2)
+        bottom = bounds.align(Volume(width=length+EE, depth=width-2*corner_r, height=corner_r+thickness/2), top=base.top+E)
         base -= c + c.y_mirror() + bottom
-        return base.align(bottom=-thickness)
+        return bounds.align(base, bottom=-thickness)
 
     def bottom_fill_side(self, width, length, corner_r, chamfer_r, thickness):
         base = Volume(width=length, depth=(width+2*thickness)/2, height=corner_r+thickness, front=0).fillet_depth(chamfer_r, bottom=True)
         base = Volume(width=length, depth=(width+2*thickness)/2, height=corner_r+thickness, front=0).fillet_depth(chamfer_r, bottom=True)
-        c = Cylinder(d=corner_r*2+thickness, h=length+EE).y_rotate(90).align(center_z=base.top, front=width/2+thickness/2)
-        bottom = Volume(width=length+EE, depth=width-2*corner_r, height=corner_r+thickness/2).align(top=base.top+E)
+        c = bounds.align(Cylinder(d=corner_r*2+thickness, h=length+EE).y_rotate(90), center_z=base.top, front=width/2+thickness/2)
+        bottom = bounds.align(Volume(width=length+EE, depth=width-2*corner_r, height=corner_r+thickness/2), top=base.top+E)
         base -= c + c.y_mirror() + bottom
-        return base.align(bottom=-thickness)
+        return bounds.align(base, bottom=-thickness)
 
 
     def init(self, width, height, length, thickness, corner_r, chamfer_r, hinge_1: HingeInfo, hinge_2: HingeInfo, hinge_clearance: float=TT, height_offset=0.0, invert_height_offset: bool|None=None, adapter: bool=False, fill_bottom: Literal["none", "side", "both", "auto"]="auto"):
@@ -158,15 +126,16 @@ class Cuff(Part):
 
         rect = RoundedRect(length, thickness, chamfer_r)
 
-        bottom = rect.y_linear_extrude(distance=inner_width).align(top=0)
-        corner = self.corner(rect, corner_r).align(back=bottom.front, bottom=bottom.bottom)
-        side = rect.z_linear_extrude(distance=locking_center-corner_r).align(back=width/2, bottom=corner.top)
+        bottom = bounds.align(rect.y_linear_extrude(distance=inner_width), top=0)
+        corner = bounds.align(self.corner(rect, corner_r), back=bounds.of(bottom).front, bottom=bounds.of(bottom).bottom)
+        side = bounds.align(rect.z_linear_extrude(distance=locking_center-corner_r), back=width/2, bottom=bounds.of(corner).top)
 
-        end = self.round_end(rect).align(center_z=side.top, center_y=side.center_y)
+        end = bounds.align(self.round_end(rect), center_z=bounds.of(side).top, center_y=bounds.of(side).center_y)
+        end_bounds = bounds.of(end)
 
         s = corner + side + end
-        h1 = self.hinge_cutout(hinge_1, length, thickness, cut_width=hinge_clearance).translate(y=end.center_y, z=end.center_z)
-        h2 = self.hinge_cutout(hinge_2, length, thickness, cut_width=hinge_clearance).translate(y=end.center_y, z=end.center_z)
+        h1 = self.hinge_cutout(hinge_1, length, thickness, cut_width=hinge_clearance).translate(y=end_bounds.center_y, z=end_bounds.center_z)
+        h2 = self.hinge_cutout(hinge_2, length, thickness, cut_width=hinge_clearance).translate(y=end_bounds.center_y, z=end_bounds.center_z)
 
         self.add_child(bottom)
         self.add_child(s)
@@ -190,14 +159,14 @@ class Adapter(Part):
         bolts = Union()
         for x_s in (-1, 1):
             for y_s in (-1, 1):
-                bolts += bolt.align(center_x=x_s*hole_distance/2, center_y=y_s*hole_distance/2)
+                bolts += bounds.align(bolt, center_x=x_s*hole_distance/2, center_y=y_s*hole_distance/2)
         self.add_child(bolts)
 
 class Magnet(Part):
     def init(self):
         magnet = Volume(width=80.0, depth=32.0, height=20.0, top=0.0)
-        screw = screws.Screw(length=30.0, metric=screws.Metric.m4, standard=screws.Standard.din912, recessed=True).add_nut(over_length=200.0).align(center_x=35.0)
-        cable = Cylinder(d=5.0, h=10.0).y_rotate(90).align(right=magnet.left, center_y=magnet.front-8.0, center_z=magnet.top-11.0)
+        screw = bounds.align(screws.Screw(length=30.0, metric=screws.Metric.m4, standard=screws.Standard.din912, recessed=True).add_nut(over_length=200.0), center_x=35.0)
+        cable = bounds.align(Cylinder(d=5.0, h=10.0).y_rotate(90), right=magnet.left, center_y=magnet.front-8.0, center_z=magnet.top-11.0)
         self.add_child(magnet)
         self.add_misc(screw + screw.x_mirror())
         self.add_misc(cable)
@@ -206,18 +175,20 @@ magnet_holder_width = 100.0
 
 class MagnetHolder(Part):
     def init(self, full_height: float, length: float, chamfer_r: float):
-        magnet = Magnet().align(top=full_height)
+        magnet = bounds.align(Magnet(), top=full_height)
+        magnet_bounds = bounds.of(magnet)
         assert full_height >= 35.0
-        thickness = (length - magnet.depth)/2
+        thickness = (length - magnet_bounds.depth)/2
         assert chamfer_r <= thickness
         root = Volume(width=magnet_holder_width, depth=length, height=full_height, bottom=0.0).fillet_height(chamfer_r).fillet_width(chamfer_r, top=True)
-        root -= Volume(width=magnet.width+TT, depth=magnet.depth+TT, height=magnet.height+TT, top=root.top+E)
+        root -= Volume(width=magnet_bounds.width+TT, depth=magnet_bounds.depth+TT, height=magnet_bounds.height+TT, top=root.top+E)
         root -= magnet
-        cable_cutout = Cylinder(d=6.0, h=30.0).y_rotate(90).align(right=magnet.left, center_y=magnet.front-8.0, center_z=magnet.top-13.0)
-        cable_cutout += Volume(bottom=cable_cutout.center_z, left=cable_cutout.left, right=cable_cutout.right, front=cable_cutout.front, back=cable_cutout.back, top=root.top+E)
+        cable_cutout = bounds.align(Cylinder(d=6.0, h=30.0).y_rotate(90), right=magnet_bounds.left, center_y=magnet_bounds.front-8.0, center_z=magnet_bounds.top-13.0)
+        cable_bounds = bounds.of(cable_cutout)
+        cable_cutout += Volume(bottom=cable_bounds.center_z, left=cable_bounds.left, right=cable_bounds.right, front=cable_bounds.front, back=cable_bounds.back, top=bounds.of(root).top+E)
         root -= cable_cutout
 
-        foot_screw = screws.Screw(length=10.0+EE, metric=screws.Metric.m5, standard=screws.Standard.din912, over_length=200.0).translate(z=10.0).align(center_y=root.front-length/4, left=magnet.right+1.0)
+        foot_screw = bounds.align(screws.Screw(length=10.0+EE, metric=screws.Metric.m5, standard=screws.Standard.din912, over_length=200.0).translate(z=10.0), center_y=bounds.of(root).front-length/4, left=magnet_bounds.right+1.0)
         foot_screws = foot_screw + foot_screw.y_mirror()
         foot_screws = foot_screws + foot_screws.x_mirror()
 
@@ -234,13 +205,13 @@ class AnchorPlate(Part):
 
 class AnchorHolder(Part):
     def init(self, full_height: float, length: float, chamfer_r: float, side_connected: bool=False):
-        plate = AnchorPlate().align(top=full_height)
+        plate = bounds.align(AnchorPlate(), top=full_height)
         root = Volume(width=magnet_holder_width, depth=length, height=full_height-E, bottom=0.0).fillet_height(chamfer_r, right=True)
         if side_connected:
             root.fillet_width(chamfer_r, bottom=True)
         if not side_connected:
             root.fillet_height(chamfer_r, left=True)
-            foot_screw = screws.Screw(length=10.0+EE, metric=screws.Metric.m5, standard=screws.Standard.din912, over_length=200.0).translate(z=10.0).align(center_y=root.front-length/4, right=root.right-2.0)
+            foot_screw = bounds.align(screws.Screw(length=10.0+EE, metric=screws.Metric.m5, standard=screws.Standard.din912, over_length=200.0).translate(z=10.0), center_y=root.front-length/4, right=root.right-2.0)
             foot_screws = foot_screw + foot_screw.y_mirror()
             foot_screws = foot_screws + foot_screws.x_mirror()
             self.add_hole(foot_screws)
@@ -256,7 +227,7 @@ class CuffBottomWithMagnet(Part):
 class CuffTopWithAnchorPlate(Part):
     def init(self, **kwargs):
         cuff = Cuff(**kwargs, fill_bottom="side")
-        holder = AnchorHolder(full_height=kwargs["height"]/2+kwargs["thickness"], **filter_dict(kwargs, ["length", "chamfer_r"]), side_connected=True).z_rotate(-90).align(front=cuff.back, bottom=cuff.bottom)
+        holder = bounds.align(AnchorHolder(full_height=kwargs["height"]/2+kwargs["thickness"], **filter_dict(kwargs, ["length", "chamfer_r"]), side_connected=True).z_rotate(-90), front=bounds.of(cuff).back, bottom=bounds.of(cuff).bottom)
         self.add_child(cuff)
         self.add_child(holder)
 
@@ -279,13 +250,13 @@ def padding_holder(thickness, length, width, chamfer_r, padding_length, show_pad
         result += padding.color("blue")
     return result
 
-def generate(
+def parts(
         width: float = 65.0,
         height: float = 45.0,
         corner_radius: float = 20.0,
         height_offset: float = 0.0,
         fill_bottom: Literal["both", "none"] = "both",
-        ) -> list[tuple[str, str]]:
+        ) -> list[tuple[str, Object]]:
     params = dict(
             thickness=15.0,
             length=40.0,
@@ -306,9 +277,15 @@ def generate(
     _ = CuffTopWithAnchorPlate(**params, hinge_1=hinge_inverted, hinge_2=hinge_inverted)
 
     return [
-            ("top", str(top)),
-            ("bottom", str(bottom)),
-            ("padding_holder", str(holder)),
+            ("top", top),
+            ("bottom", bottom),
+            ("padding_holder", holder),
             ]
 
+def generate(**parameters) -> list[tuple[str, str]]:
+    return [(name, str(part)) for name, part in parts(**parameters)]
+
+# the parameters of generate() are the ones of parts(), since they are parsed from its signature
+generate.__signature__ = inspect.signature(parts).replace(return_annotation=list[tuple[str, str]])
+
 
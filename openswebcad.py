@@ -1,179 +1,99 @@
-import asyncio
-from typing import Literal, Any, _LiteralGenericAlias
-import base64
 import importlib
 
-import js
-import pyodide
-from pyodide.ffi import create_proxy
 from pyodide.http import pyfetch
 
+import catalogue
+import cost
 import parse
 from util import InvalidParameterException
 
+# runs inside python_worker.js, the page only talks to it through messages (see openswebcadjs.js)
 
-async def run_scad_worker(name: str, scad_code: str):
-    assert isinstance(scad_code, str)
-    worker = js.Worker.new("worker.js", js.Object.fromEntries([["type", "module"]]))
-    future = asyncio.get_event_loop().create_future()
+# estimated seconds the OpenSCAD workers of the page may take, in openscad-wasm time as recorded by
+# `calibrate_cost.py -b wasm`: the quality is lowered to fit into the budget,
+# and parameters that do not even fit into the limit at the lowest quality are refused
+TIME_BUDGET = 10.0
+TIME_LIMIT = 120.0
 
-    def on_message(event):
-        future.set_result(event.data)
-        worker.terminate()
 
-    def on_error(event):
-        future.set_exception(RuntimeError("openscad run failed"))
-        worker.terminate()
-
-    worker.onmessage = on_message
-    worker.onerror = on_error
-
-    worker.postMessage(js.Object.fromEntries([["name", name], ["scad_code", scad_code]]))
-
-    return future
-
-
-class Parameter:
-    def __init__(self, description):
-        self.description = description
-        self.value = None
-
-    def add_description(self, form):
-        d = js.document.createElement("div")
-        d.innerHTML = self.description
-        d.classList.add("form-text")
-        form.appendChild(d)
-        return d
-
-    def add_form_element(self, form):
-        raise NotImplementedError()
-
-ScadCodes = list[tuple[str, str]]
-
-class ModelWrapper:
-    def __init__(self, display, form, generator):
-        assert display
-        self.display = display
-        self.model = generator
-        self.parameters = {}
-        self.viewers: dict[str, dict[str,Any]] = {}
-        self.counter = 0
-        self.start_button = None
-        self.parameters: list[Parameter] = parse_parameters(generator)
-        self.error_display = None
-        self.init_form(form)
-
-    def init_form(self, form):
-        for p in self.parameters:
-            p.add_form_element(form, self.update_scad)
-
-        self.error_display = js.document.createElement("div")
-        self.error_display.classList.add("alert")
-        self.error_display.classList.add("alert-warning")
-        self.error_display.style.visibility = "hidden"
-        form.appendChild(self.error_display)
-
-        self.start_button = js.document.createElement("button")
-        self.start_button.innerHTML = "generate"
-        self.start_button.classList.add("btn")
-        self.start_button.classList.add("btn-primary")
-        async def on_generate(event):
-            await self.update_viewers()
-        self.start_button.addEventListener("click", create_proxy(on_generate))
-        self.start_button.disabled = any(p.default is None for p in self.parameters)
-        form.appendChild(self.start_button)
+def describe_parameter(p: parse.Parameter) -> dict:
+    if isinstance(p, parse.NumericParameter):
+        return {"kind": "numeric", "name": p.name, "description": p.description, "default": p.default}
+    if isinstance(p, parse.ChoiceParameter):
+        return {"kind": "choice", "name": p.name, "description": p.description, "choices": p.choices, "default": p.default}
+    raise NotImplementedError(f"unknown parameter type: {type(p)}")
 
+def convert_parameter(p: parse.Parameter, value: str | None):
+    if value is None:
+        return None
+    if isinstance(p, parse.NumericParameter):
+        try:
+            return p.t(value)
+        except ValueError as e:
+            print(e)
+            return None
+    if isinstance(p, parse.ChoiceParameter):
+        return value if value in p.choices else None
+    raise NotImplementedError(f"unknown parameter type: {type(p)}")
 
 
-    def init_display(self, scad_codes: ScadCodes):
-        for name, _ in scad_codes:
-            render_container = createRendererSurrounding(self.display, name)
-            link = js.document.createElement("a")
-            link.innerHTML = f"download {name}"
-            link.href = "#"
-            render_container.appendChild(link)
-            render_spinner = createRendererSpinner(render_container)
-            render_viewer = createRenderer(render_container)
+class Generator:
+    def __init__(self, model, catalogue_index, calibration):
+        self.model = model
+        self.parameters = parse.parse_parameters(model.generate)
+        self.catalogue_index = catalogue_index
+        self.calibration = calibration
 
-            assert render_viewer
-            assert render_spinner
-            render_spinner.style.display = "none"
-            
-            v = {"viewer": render_viewer, "spinner": render_spinner, "link": link}
-            self.viewers[name] = v
+    def describe(self) -> list[dict]:
+        return [describe_parameter(p) for p in self.parameters]
 
-    async def update_scad(self) -> dict[str, str] | None:
+    def generate(self, values: dict[str, str], workers: int = 1) -> dict:
         try:
-            parameters = {p.name: p.value for p in self.parameters}
+            parameters = {p.name: convert_parameter(p, values.get(p.name)) for p in self.parameters}
             print(parameters)
             invalid_parameters = [name for name, value in parameters.items() if value is None]
             if invalid_parameters:
                 raise InvalidParameterException(parameters=invalid_parameters, message="invalid input")
-            scad_codes = self.model(**parameters)
+            entry = catalogue.lookup(self.catalogue_index, parameters)
+            if entry is not None:
+                return {"catalogue": [[name, f"./catalogue/{catalogue.part_file(entry, name, 'stl')}"] for name in entry["parts"]]}
+            if self.calibration is None:
+                return {"scad": [[name, code] for name, code in self.model.generate(**parameters)], "quality": "full"}
+            quality, parts, _ = cost.plan(lambda: self.model.parts(**parameters), self.calibration, "auto", workers, TIME_BUDGET, TIME_LIMIT)
+            # the page starts the parts in this order, slowest first
+            return {"scad": [[name, str(part)] for name, part in parts], "quality": quality}
         except InvalidParameterException as e:
-            self.show_status_error(e)
-            return None
+            print(f"generation had error: {e}")
+            return {"error": str(e), "parameters": e.parameters}
         except Exception as e:
-            self.show_status_error(e)
-            return None
-        else:
-            self.no_error()
-            return scad_codes
-
-    async def update_viewers(self):
-        scad_codes: ScadCodes | None = await self.update_scad()
-        self.start_button.disabled = True
-        if not scad_codes:
-            return
-        if not self.viewers:
-            self.init_display(scad_codes)
-        for name, _ in scad_codes:
-            self.viewers[name]["spinner"].style.display = "block"
-        stl_futures = []
-        for name, code in scad_codes:
-            self.counter += 1
-            stl_futures.append(await run_scad_worker(name, code))
-        for future in asyncio.as_completed(stl_futures):
-            stl_data = (await future).to_py()
-            self.render_stl(stl_data["name"], stl_data["stl"])
-
-    def render_stl(self, name: str, stl_data):
-        stl = js.Uint8Array.new(stl_data)
-        blob = js.Blob.new([stl], {"type": "application/octet-stream"})
-        url = js.URL.createObjectURL(blob)
-        viewer_file_name = f"/{name}_view.stl"
-        file_fp = js.File.new([stl], viewer_file_name, {"type": "application/octet-stream"})
-        self.viewers[name]["link"].href = url
-        self.viewers[name]["link"].download = f"{name}.stl"
-        self.viewers[name]["viewer"].LoadModelFromFileList([file_fp])
-        self.viewers[name]["spinner"].style.display = "none"
-        print(f"finished updating model {name}")
+            print(f"generation had error: {e}")
+            return {"error": str(e), "parameters": []}
 
-    def show_status_error(self, message: str | InvalidParameterException):
-        if isinstance(message, InvalidParameterException):
-            # TODO: mark forms as invalid
-            pass
-        self.error_display.innerHTML = str(message)
-        self.error_display.style.visibility = "visible"
-        self.start_button.disabled = True
-        print(f"generation had error: {message}")
 
-    def no_error(self):
-        self.error_display.style.visibility = "hidden"
-        self.start_button.disabled = False
-        print("generation successful")
-
-async def run(model):
+async def setup(model) -> Generator:
     print("openswebcad loading")
-
-    display = js.document.getElementById("model-display")
-    form = js.document.getElementById("parameter-selection")
-    assert display
-
     await load_local_includes(model)
-
-    model_wrapper = ModelWrapper(display, form, model.generate)
+    generator = Generator(model, await load_catalogue_index(), await load_calibration())
     print("setup completed")
+    return generator
+
+async def load_catalogue_index():
+    response = await pyfetch(f"./catalogue/{catalogue.INDEX_NAME}")
+    if not response.ok:
+        print("no catalogue available, all parts are generated live")
+        return None
+    return await response.json()
+
+async def load_calibration():
+    response = await pyfetch(f"./{cost.CALIBRATION_FILE.name}")
+    if not response.ok:
+        print("no cost calibration available, all parts are generated in full quality")
+        return None
+    # the page renders with openscad-wasm, which is much slower than a native OpenSCAD
+    calibration = cost.calibration_from_dict(await response.json(), "wasm")
+    if calibration is None:
+        print("openscad-wasm is not calibrated, all parts are generated in full quality")
+    return calibration
 
 async def load_local_includes(model):
     if not hasattr(model, "includes"):
@@ -191,95 +111,3 @@ async def load_file(name: str, url: str):
     module = importlib.util.module_from_spec(spec)
     spec.loader.exec_module(module)
     return module
-
-# parameter parsing
-class NumericParameter(Parameter):
-    def __init__(self, name: str, description: str, t: Literal[int, float], default: int|float|None):
-        super().__init__(description)
-        self.name = name
-        self.convert = t
-        self.default = default
-        self.value = default
-
-    def add_form_element(self, form, on_change_cb):
-        d = self.add_description(form)
-        i = js.document.createElement("input")
-        i.type = "number"
-        if self.default is not None:
-            i.value = self.default
-        i.classList.add("form-control")
-        #i.id = f"parameter-{self.name}"
-
-        async def on_change(event):
-            try:
-                self.value = self.convert(event.target.value)
-            except ValueError as e:
-                print(e)
-                self.value = None
-            await on_change_cb()
-        i.addEventListener("change", create_proxy(on_change))
-
-        
-        form.appendChild(i)
-
-class ChoiceParameter(Parameter):
-    def __init__(self, name: str, description: str, choices: list[str], default: str|None):
-        super().__init__(description)
-        self.name = name
-        self.parameter_target = None
-        self.choices = choices
-        self.default = default
-        self.value = default
-
-    def add_form_element(self, form, on_change_cb):
-        d = self.add_description(form)
-        group = js.document.createElement("div")
-        group.classList.add("btn-group")
-        group.role = "group"
-        group.ariaLabel = self.description
-        
-        for choice in self.choices:
-            i = js.document.createElement("input")
-            i.type = "radio"
-            i.value = choice
-            if choice == self.default:
-                i.checked = True
-            i.name = f"parameter-{self.name}"
-            i.id = f"parameter-{self.name}-{choice}"
-            i.classList.add("btn-check")
-            i.autocomplete = "off"
-
-            l = js.document.createElement("label")
-            l.classList.add("btn")
-            l.classList.add("btn-outline-primary")
-            l.htmlFor = i.id
-            l.innerHTML = choice
-            #i.id = f"parameter-{self.name}"
-
-            async def on_change(event, choice=choice):
-                if event.target.checked:
-                    self.value = choice
-                print(f"choice {choice} changed to {event.target.checked}")
-                await on_change_cb()
-            i.addEventListener("change", create_proxy(on_change))
-
-            group.appendChild(i)
-            group.appendChild(l)
-
-        
-        form.appendChild(group)
-
-
-
-
-
-def parse_parameters(generator_func):
-    return [map_parameter(p) for p in parse.parse_parameters(generator_func)]
-
-def map_parameter(p: parse.Parameter) -> Parameter:
-    assert isinstance(p, parse.Parameter)
-    if isinstance(p, parse.NumericParameter):
-        return NumericParameter(name=p.name, description=p.description, t=p.t, default=p.default)
-    if isinstance(p, parse.ChoiceParameter):
-        return ChoiceParameter(name=p.name, description=p.description, choices=p.choices, default=p.default)
-    raise NotImplementedError(f"unknown parameter type: {type(parameter)}")
@@ -1,8 +1,21 @@
-import OpenSCAD from "./openscad-wasm/openscad.js";
-import "https://cdn.jsdelivr.net/pyodide/v0.28.3/full/pyodide.js";
+// main thread: only the form and the viewers live here.
+// python (pyodide + model) runs in python_worker.js, openscad in worker.js
 
 export async function main(){
-	await loadOpenswebcad();
+	const display = document.getElementById("model-display");
+	const form = document.getElementById("parameter-selection");
+	const python = new PythonWorker();
+	try {
+		const parameters = await python.call("describe");
+		new ModelWrapper(display, form, python, parameters);
+	} catch (error) {
+		// without the model there is no form to show the error in
+		const errorDisplay = document.createElement("div");
+		errorDisplay.classList.add("alert");
+		errorDisplay.classList.add("alert-danger");
+		errorDisplay.textContent = `Loading the model failed: ${error.message}`;
+		form.appendChild(errorDisplay);
+	}
 }
 
 export function createRendererSurrounding(parentNode, name) {
@@ -39,55 +52,268 @@ export function createRenderer(parentNode) {
 	});
 }
 
-async function downloadFile(pyodide, filename) {
-	await pyodide.runPythonAsync(`
-from pyodide.http import pyfetch
-response = await pyfetch("${filename}")
-response.raise_for_status()
-with open("${filename}", "wb") as f:
-    f.write(await response.bytes())
-`);
-}
+// message based access to python_worker.js: call() resolves with the answer to that request
+class PythonWorker {
+	constructor() {
+		this.worker = new Worker("python_worker.js", {type: "module"});
+		this.requests = new Map();
+		this.counter = 0;
+		// set once the worker failed, e.g. while loading pyodide; it answers nothing after that
+		this.error = null;
+		this.worker.onerror = (e) => {
+			e.preventDefault();
+			this.fail(new Error(`python worker failed: ${e.message || "could not be loaded"}`));
+		};
+		this.worker.onmessageerror = () => {
+			this.fail(new Error("python worker sent a message that could not be read"));
+		};
+		this.worker.onmessage = (e) => {
+			const request = this.requests.get(e.data.id);
+			if (request == null) {
+				// already rejected by fail()
+				return;
+			}
+			this.requests.delete(e.data.id);
+			if ("error" in e.data) {
+				request.reject(new Error(e.data.error));
+			} else {
+				request.resolve(e.data.result);
+			}
+		};
+	}
 
-async function getRequirements() {
-	const response = await fetch("requirements.txt");
-	if(!response.ok) {
-		throw new Error("Failed to download requirements.txt");
+	fail(error) {
+		this.error = error;
+		for (const request of this.requests.values()) {
+			request.reject(error);
+		}
+		this.requests.clear();
 	}
-	const text = await response.text();
-	return text.split(/r?\n/);
-}
 
-async function installPackages(pyodide) {
-	await pyodide.loadPackage("micropip");
-	const micropip = pyodide.pyimport("micropip");
-	await downloadFile(pyodide, "requirements.txt");
-	const requirements = await getRequirements();
-	for (const r of requirements) {
-		if(!r.trim())
-			continue;
-		console.log(`installing ${r}`);
-		await micropip.install(r);
+	call(type, payload = {}) {
+		const id = this.counter++;
+		return new Promise((resolve, reject) => {
+			if (this.error != null) {
+				reject(this.error);
+				return;
+			}
+			this.requests.set(id, {resolve: resolve, reject: reject});
+			this.worker.postMessage({"id": id, "type": type, ...payload});
+		});
 	}
 }
 
-async function loadOpenswebcad(openscad){
-	let pyodide = await loadPyodide();
-	await installPackages(pyodide);
-	await downloadFile(pyodide, "openswebcad.py");
-	await downloadFile(pyodide, "parse.py");
-	await downloadFile(pyodide, "model.py");
-	await downloadFile(pyodide, "util.py");
-	pyodide.globals.set("createRendererSurrounding", createRendererSurrounding);
-	pyodide.globals.set("createRenderer", createRenderer);
-	pyodide.globals.set("createRendererSpinner", createRendererSpinner);
-	await pyodide.runPythonAsync(`
-import openswebcad
-import model
-openswebcad.createRenderer=createRenderer
-openswebcad.createRendererSpinner=createRendererSpinner
-openswebcad.createRendererSurrounding=createRendererSurrounding
-openswebcad.run(model)
-	`);
+function runScadWorker(name, scadCode) {
+	return new Promise((resolve, reject) => {
+		const worker = new Worker("worker.js", {type: "module"});
+		worker.onmessage = (event) => {
+			resolve(event.data);
+			worker.terminate();
+		};
+		worker.onerror = (event) => {
+			reject(new Error("openscad run failed"));
+			worker.terminate();
+		};
+		worker.postMessage({"name": name, "scad_code": scadCode});
+	});
+}
+
+// renders the parts in the given order with at most `workers` OpenSCAD instances at a time
+async function runScadWorkers(parts, workers, onFinished) {
+	const queue = [...parts];
+	const runners = Array.from({length: Math.min(workers, queue.length)}, async () => {
+		while (queue.length > 0) {
+			const [name, code] = queue.shift();
+			onFinished(await runScadWorker(name, code));
+		}
+	});
+	await Promise.all(runners);
+}
+
+function addDescription(form, parameter) {
+	let d = document.createElement("div");
+	d.innerHTML = parameter.description;
+	d.classList.add("form-text");
+	form.appendChild(d);
+	return d;
 }
 
+class ModelWrapper {
+	constructor(display, form, python, parameters) {
+		this.display = display;
+		this.python = python;
+		this.parameters = parameters;
+		// raw form values, python converts and validates them
+		// a missing default arrives as undefined (pyodide converts None that way), so compare with == null
+		this.values = Object.fromEntries(parameters.map(p => [p.name, p.default == null ? null : String(p.default)]));
+		this.viewers = {};
+		// the python side estimates the render time for this many parallel OpenSCAD workers
+		this.workers = navigator.hardwareConcurrency || 2;
+		this.initForm(form);
+	}
+
+	initForm(form) {
+		for (const p of this.parameters) {
+			addDescription(form, p);
+			if (p.kind === "numeric") {
+				this.addNumericElement(form, p);
+			} else if (p.kind === "choice") {
+				this.addChoiceElement(form, p);
+			} else {
+				throw new Error(`unknown parameter type: ${p.kind}`);
+			}
+		}
+
+		this.errorDisplay = document.createElement("div");
+		this.errorDisplay.classList.add("alert");
+		this.errorDisplay.classList.add("alert-warning");
+		this.errorDisplay.style.visibility = "hidden";
+		form.appendChild(this.errorDisplay);
+
+		this.startButton = document.createElement("button");
+		this.startButton.innerHTML = "generate";
+		this.startButton.classList.add("btn");
+		this.startButton.classList.add("btn-primary");
+		this.startButton.addEventListener("click", async (event) => {
+			await this.updateViewers();
+		});
+		this.startButton.disabled = this.parameters.some(p => p.default == null);
+		form.appendChild(this.startButton);
+	}
+
+	addNumericElement(form, p) {
+		let i = document.createElement("input");
+		i.type = "number";
+		if (p.default != null) {
+			i.value = p.default;
+		}
+		i.classList.add("form-control");
+		i.addEventListener("change", async (event) => {
+			this.values[p.name] = event.target.value;
+			await this.updateScad();
+		});
+		form.appendChild(i);
+	}
+
+	addChoiceElement(form, p) {
+		let group = document.createElement("div");
+		group.classList.add("btn-group");
+		group.role = "group";
+		group.ariaLabel = p.description;
+
+		for (const choice of p.choices) {
+			let i = document.createElement("input");
+			i.type = "radio";
+			i.value = choice;
+			if (choice === p.default) {
+				i.checked = true;
+			}
+			i.name = `parameter-${p.name}`;
+			i.id = `parameter-${p.name}-${choice}`;
+			i.classList.add("btn-check");
+			i.autocomplete = "off";
+
+			let l = document.createElement("label");
+			l.classList.add("btn");
+			l.classList.add("btn-outline-primary");
+			l.htmlFor = i.id;
+			l.innerHTML = choice;
+
+			i.addEventListener("change", async (event) => {
+				if (event.target.checked) {
+					this.values[p.name] = choice;
+				}
+				console.log(`choice ${choice} changed to ${event.target.checked}`);
+				await this.updateScad();
+			});
+
+			group.appendChild(i);
+			group.appendChild(l);
+		}
+		form.appendChild(group);
+	}
+
+	initDisplay(names) {
+		for (const name of names) {
+			let renderContainer = createRendererSurrounding(this.display, name);
+			let link = document.createElement("a");
+			link.innerHTML = `download ${name}`;
+			link.href = "#";
+			renderContainer.appendChild(link);
+			let renderSpinner = createRendererSpinner(renderContainer);
+			let renderViewer = createRenderer(renderContainer);
+			renderSpinner.style.display = "none";
+			this.viewers[name] = {"viewer": renderViewer, "spinner": renderSpinner, "link": link};
+		}
+	}
+
+	// asks the python worker for the parts, returns null (and shows the error) if the parameters are invalid
+	async updateScad() {
+		let result;
+		try {
+			result = await this.python.call("generate", {"parameters": this.values, "workers": this.workers});
+		} catch (error) {
+			this.showStatusError(error.message, []);
+			return null;
+		}
+		if ("error" in result) {
+			this.showStatusError(result.error, result.parameters);
+			return null;
+		}
+		this.noError();
+		return result;
+	}
+
+	async updateViewers() {
+		const result = await this.updateScad();
+		this.startButton.disabled = true;
+		if (!result) {
+			return;
+		}
+		const parts = result.catalogue ?? result.scad;
+		if (Object.keys(this.viewers).length === 0) {
+			this.initDisplay(parts.map(([name, _]) => name));
+		}
+		for (const [name, _] of parts) {
+			this.viewers[name].spinner.style.display = "block";
+		}
+		if (result.catalogue) {
+			await Promise.all(result.catalogue.map(async ([name, url]) => {
+				const response = await fetch(url);
+				this.renderStl(name, await response.arrayBuffer());
+			}));
+			console.log("served parts from catalogue");
+			return;
+		}
+		console.log(`rendering parts in ${result.quality} quality`);
+		// the parts arrive slowest first, so the slowest one does not start last
+		await runScadWorkers(result.scad, this.workers, (stlData) => this.renderStl(stlData.name, stlData.stl));
+	}
+
+	renderStl(name, stlData) {
+		const stl = new Uint8Array(stlData);
+		const blob = new Blob([stl], {"type": "application/octet-stream"});
+		const url = URL.createObjectURL(blob);
+		const viewerFileName = `/${name}_view.stl`;
+		const file = new File([stl], viewerFileName, {"type": "application/octet-stream"});
+		this.viewers[name].link.href = url;
+		this.viewers[name].link.download = `${name}.stl`;
+		this.viewers[name].viewer.LoadModelFromFileList([file]);
+		this.viewers[name].spinner.style.display = "none";
+		console.log(`finished updating model ${name}`);
+	}
+
+	showStatusError(message, invalidParameters) {
+		// TODO: mark forms as invalid
+		this.errorDisplay.innerHTML = message;
+		this.errorDisplay.style.visibility = "visible";
+		this.startButton.disabled = true;
+		console.log(`generation had error: ${message}`);
+	}
+
+	noError() {
+		this.errorDisplay.style.visibility = "hidden";
+		this.startButton.disabled = false;
+		console.log("generation successful");
+	}
+}
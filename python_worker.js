@@ -0,0 +1,83 @@
+import { loadPyodide } from "https://cdn.jsdelivr.net/pyodide/v0.28.3/full/pyodide.mjs";
+
+// runs pyodide and the model off the main thread, see PythonWorker in openswebcadjs.js for the other side
+
+let pyodide = null;
+const generator = setup();
+
+async function downloadFile(pyodide, filename) {
+	await pyodide.runPythonAsync(`
+from pyodide.http import pyfetch
+response = await pyfetch("${filename}")
+response.raise_for_status()
+with open("${filename}", "wb") as f:
+    f.write(await response.bytes())
+`);
+}
+
+async function getRequirements() {
+	const response = await fetch("requirements.txt");
+	if(!response.ok) {
+		throw new Error("Failed to download requirements.txt");
+	}
+	const text = await response.text();
+	return text.split(/r?\n/);
+}
+
+async function installPackages(pyodide) {
+	await pyodide.loadPackage("micropip");
+	const micropip = pyodide.pyimport("micropip");
+	await downloadFile(pyodide, "requirements.txt");
+	const requirements = await getRequirements();
+	for (const r of requirements) {
+		if(!r.trim())
+			continue;
+		console.log(`installing ${r}`);
+		await micropip.install(r);
+	}
+}
+
+async function setup() {
+	pyodide = await loadPyodide();
+	await installPackages(pyodide);
+	await downloadFile(pyodide, "openswebcad.py");
+	await downloadFile(pyodide, "parse.py");
+	await downloadFile(pyodide, "model.py");
+	await downloadFile(pyodide, "util.py");
+	await downloadFile(pyodide, "bounds.py");
+	await downloadFile(pyodide, "catalogue.py");
+	await downloadFile(pyodide, "cost.py");
+	// not imported, only hashed to check catalogues built with the manifold backend
+	await downloadFile(pyodide, "mesh.py");
+	return await pyodide.runPythonAsync(`
+import openswebcad
+import model
+await openswebcad.setup(model)
+	`);
+}
+
+function toJs(result) {
+	const converted = result.toJs({dict_converter: Object.fromEntries});
+	result.destroy();
+	return converted;
+}
+
+onmessage = async (e) => {
+	const id = e.data.id;
+	try {
+		const g = await generator;
+		let result;
+		if (e.data.type === "describe") {
+			result = toJs(g.describe());
+		} else if (e.data.type === "generate") {
+			const values = pyodide.toPy(e.data.parameters);
+			result = toJs(g.generate(values, e.data.workers));
+			values.destroy();
+		} else {
+			throw new Error(`unknown request ${e.data.type}`);
+		}
+		postMessage({"id": id, "result": result});
+	} catch (error) {
+		postMessage({"id": id, "error": String(error)});
+	}
+};
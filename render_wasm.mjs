@@ -0,0 +1,35 @@
+// renders a .scad file with openscad-wasm under node, the way worker.js does it in the browser,
+// and prints the time taken and the triangle count as JSON; used by calibrate_cost.py
+// usage: node render_wasm.mjs part.scad (needs openscad-wasm/openscad.wasm next to openscad.js)
+import { readFile } from "node:fs/promises";
+import { createRequire } from "node:module";
+
+const directory = new URL("./openscad-wasm/", import.meta.url);
+
+async function loadOpenscad() {
+	// the emscripten glue expects CommonJS when it detects node
+	globalThis.require = createRequire(import.meta.url);
+	const module = {
+		noInitialRun: true,
+		wasmBinary: await readFile(new URL("openscad.wasm", directory)),
+		print: () => {},
+		printErr: () => {},
+	};
+	globalThis.OpenSCAD = module;
+	await import(new URL("openscad.wasm.js", directory).href);
+	delete globalThis.OpenSCAD;
+	await new Promise((resolve) => {
+		module.onRuntimeInitialized = () => resolve(null);
+	});
+	return module;
+}
+
+const scadCode = await readFile(process.argv[2], "utf8");
+// worker.js starts a fresh instance for every part, so that is part of the measured time
+const start = performance.now();
+const openscad = await loadOpenscad();
+openscad.FS.writeFile("/part.scad", scadCode);
+openscad.callMain(["/part.scad", "--enable=manifold", "-o", "/part.stl"]);
+const stl = openscad.FS.readFile("/part.stl", {encoding: "utf8"});
+const seconds = (performance.now() - start) / 1000;
+console.log(JSON.stringify({"seconds": seconds, "triangles": stl.split("endfacet").length - 1}));
@@ -0,0 +1,104 @@
+import math
+
+import pytest
+
+from muscad import Cube, Cylinder, Square, Union, Volume
+
+import bounds
+from bounds import Bounds
+
+
+def test_cube():
+    assert bounds.of(Cube(2, 4, 6)) == Bounds(-1, 1, -2, 2, -3, 3)
+
+def test_translate():
+    assert bounds.of(Cube(2, 2, 2).translate(x=1, y=2, z=3)) == Bounds(0, 2, 1, 3, 2, 4)
+
+@pytest.mark.parametrize("angles", [
+    dict(x=90), dict(y=90), dict(z=90), dict(x=180), dict(y=-90), dict(z=270),
+    dict(x=90, z=90), dict(x=90, y=90, z=180), dict(y=90, z=270),
+    ])
+def test_rotation_matches_muscad(angles):
+    obj = Cube(2, 4, 6).translate(x=1, y=-3, z=5).rotate(**angles)
+    b = bounds.of(obj)
+    for side in bounds.SIDES:
+        assert getattr(b, side) == pytest.approx(getattr(obj, side)), side
+
+def test_mirror():
+    assert bounds.of(Cube(2, 2, 2).translate(x=3).x_mirror()) == Bounds(-4, -2, -1, 1, -1, 1)
+
+def test_difference_uses_first_child():
+    assert bounds.of(Cube(2, 2, 2) - Cube(10, 10, 10)) == Bounds(-1, 1, -1, 1, -1, 1)
+
+def test_volume():
+    assert bounds.of(Volume(left=0, width=3, back=1, depth=2, bottom=-1, top=4)) == Bounds(0, 3, 1, 3, -1, 4)
+
+def test_rotational_extrude():
+    # muscad's own RotationalExtrusion.right is not a property, so most of its sides can't be queried directly
+    obj = Square(2, 4).translate(x=5).rotational_extrude()
+    assert bounds.of(obj) == Bounds(-6, 6, -6, 6, -2, 2)
+
+def test_partial_rotational_extrude():
+    obj = Square(1, 1).translate(x=2.5).rotational_extrude(90)
+    assert bounds.of(obj) == pytest.approx(Bounds(0, 3, 0, 3, -0.5, 0.5))
+
+def test_partial_rotational_extrude_negative_side():
+    # swept from -x on, like OpenSCAD does it
+    obj = Square(1, 1).translate(x=-2.5).rotational_extrude(90)
+    assert bounds.of(obj) == pytest.approx(Bounds(-3, 0, -3, 0, -0.5, 0.5))
+
+def test_partial_rotational_extrude_crossing_axis():
+    obj = Square(1, 1).translate(x=2.5).rotational_extrude(135)
+    b = bounds.of(obj)
+    assert (b.right, b.front, b.back) == pytest.approx((3, 3, 0))
+    assert b.left == pytest.approx(-3 * math.sqrt(0.5))
+
+def test_linear_extrude():
+    assert bounds.of(Square(2, 4).linear_extrude(10)) == Bounds(-1, 1, -2, 2, 0, 10)
+
+def test_union_growth_invalidates_cache():
+    u = Union(Cube(2, 2, 2))
+    assert bounds.of(u).right == 1
+    u += Cube(2, 2, 2).translate(x=5)
+    assert bounds.of(u).right == 6
+
+def test_pin():
+    obj = bounds.pin(Cylinder(d=2, h=2), Bounds(0, 1, 0, 1, 0, 1))
+    assert bounds.of(obj.translate(x=1)) == Bounds(1, 2, 0, 1, 0, 1)
+
+def test_align():
+    obj = bounds.align(Cube(2, 2, 2), left=0, center_y=5, top=0)
+    assert bounds.of(obj) == Bounds(0, 2, 4, 6, -2, 0)
+
+def test_each_node_is_measured_once(monkeypatch):
+    computed = []
+    compute = bounds._compute
+    monkeypatch.setattr(bounds, "_compute", lambda obj: computed.append(obj) or compute(obj))
+    obj = Cube(1, 1, 1)
+    for _ in range(100):
+        obj = bounds.align(obj, left=0) + Cube(1, 1, 1)
+    # muscad's own properties walk the whole chain on every align(), i.e. quadratic in its depth
+    assert len(computed) <= 4 * 100
+
+def _nodes(obj):
+    # vars(): transformations forward unknown attributes to their child
+    children = [*vars(obj).get("children", []), *vars(obj).get("miscellaneous", []), *vars(obj).get("holes", [])]
+    children += [vars(obj)[name] for name in ("child", "object") if name in vars(obj)]
+    yield obj
+    for c in children:
+        yield from _nodes(c)
+
+@pytest.mark.parametrize("parameters", [{}, {"height_offset": 2.5, "fill_bottom": "none"}])
+def test_model_only_grows_roots_of_measured_subtrees(parameters):
+    # the rule documented in bounds.of(): otherwise cached bounds of ancestors would be stale
+    import model
+    for _, part in model.parts(**parameters):
+        nodes = list({id(n): n for n in _nodes(part)}.values())
+        cached = {id(n): vars(n)["_bounds"][1] for n in nodes if "_bounds" in vars(n)}
+        for n in nodes:
+            # pinned bounds are explicit overrides, they are not measured
+            if not isinstance(n, model.OverriddenBounding):
+                vars(n).pop("_bounds", None)
+        for n in nodes:
+            if id(n) in cached:
+                assert bounds.of(n) == cached[id(n)]
@@ -0,0 +1,99 @@
+import json
+import sys
+
+import pytest
+
+import build_catalogue
+import catalogue
+import cmdline
+import model
+import parse
+
+
+def test_canonical_key_is_sorted():
+    assert catalogue.canonical_key({"b": 1.0, "a": "x"}) == "a=x,b=1.0"
+
+def test_canonical_key_negative_zero():
+    assert catalogue.canonical_key({"a": -0.0}) == catalogue.canonical_key({"a": 0.0})
+
+def make_index(parameters):
+    key = catalogue.canonical_key(parameters)
+    return {"model_version": catalogue.model_version("openscad"), "backend": "openscad", "entries": {key: {"directory": "d", "parameters": parameters, "parts": ["top"]}}}
+
+def test_lookup():
+    index = make_index({"width": 65.0})
+    assert catalogue.lookup(index, {"width": 65.0})["directory"] == "d"
+    assert catalogue.lookup(index, {"width": 66.0}) is None
+    assert catalogue.lookup(None, {"width": 65.0}) is None
+
+def test_lookup_outdated_model():
+    index = make_index({"width": 65.0})
+    index["model_version"] = "outdated"
+    assert catalogue.lookup(index, {"width": 65.0}) is None
+
+def test_part_file():
+    entry = {"directory": "d", "parts": ["top"]}
+    assert catalogue.part_file(entry, "top", "openscad") == "d/top.scad"
+    assert catalogue.part_file(entry, "top", "stl") == "d/top.stl"
+
+@pytest.mark.parametrize("standard", build_catalogue.STANDARD_PARAMETERS)
+def test_standard_parameters_generate(standard):
+    parameters = cmdline.check_parameters(parse.parse_parameters(model.generate), {k: str(v) for k, v in standard.items()})
+    assert [name for name, _ in model.generate(**parameters)] == ["top", "bottom", "padding_holder"]
+
+def test_generate_takes_the_parameters_of_parts():
+    assert model.generate.__name__ == "generate"
+    assert [q.name for q in parse.parse_parameters(model.generate)] == [q.name for q in parse.parse_parameters(model.parts)]
+
+def test_model_version_depends_on_backend():
+    assert catalogue.model_version("openscad") != catalogue.model_version("manifold")
+
+def test_lookup_other_backend():
+    index = make_index({"width": 65.0})
+    index["backend"] = "manifold"
+    assert catalogue.lookup(index, {"width": 65.0}) is None
+    del index["backend"]
+    assert catalogue.lookup(index, {"width": 65.0}) is None
+
+
+@pytest.fixture
+def manifold_catalogue(tmp_path):
+    pytest.importorskip("manifold3d")
+    build_catalogue.build(tmp_path / "catalogue", "manifold", [{}])
+    return tmp_path / "catalogue"
+
+def run_cmdline(monkeypatch, *args):
+    monkeypatch.setattr(sys, "argv", ["cmdline.py", *map(str, args)])
+    cmdline.main()
+
+def test_cmdline_serves_catalogue(tmp_path, monkeypatch, manifold_catalogue):
+    index = catalogue.load_index(manifold_catalogue)
+    (key, entry), = index["entries"].items()
+    run_cmdline(monkeypatch, tmp_path / "out", "-f", "stl", "-b", "manifold", "--catalogue", manifold_catalogue)
+    for name in entry["parts"]:
+        assert (tmp_path / "out" / f"{name}.stl").read_bytes() == (manifold_catalogue / catalogue.part_file(entry, name, "stl")).read_bytes()
+
+def test_cmdline_generates_other_sizes_live(tmp_path, monkeypatch, manifold_catalogue):
+    monkeypatch.setattr(cmdline, "copy_from_catalogue", lambda *args: pytest.fail("served from catalogue"))
+    run_cmdline(monkeypatch, tmp_path / "out", "width=70.0", "-f", "stl", "-b", "manifold", "--catalogue", manifold_catalogue)
+    assert (tmp_path / "out" / "top.stl").exists()
+
+def test_cmdline_ignores_outdated_catalogue(tmp_path, monkeypatch, manifold_catalogue):
+    index = catalogue.load_index(manifold_catalogue)
+    index["model_version"] = "outdated"
+    (manifold_catalogue / catalogue.INDEX_NAME).write_text(json.dumps(index))
+    monkeypatch.setattr(cmdline, "copy_from_catalogue", lambda *args: pytest.fail("served from catalogue"))
+    run_cmdline(monkeypatch, tmp_path / "out", "-f", "stl", "-b", "manifold", "--catalogue", manifold_catalogue)
+    assert (tmp_path / "out" / "top.stl").exists()
+
+@pytest.mark.parametrize("quality", [["-q", "draft"], ["-q", "auto", "--time-budget", "0"]])
+def test_cmdline_generates_lower_quality_live(tmp_path, monkeypatch, manifold_catalogue, quality):
+    monkeypatch.setattr(cmdline, "copy_from_catalogue", lambda *args: pytest.fail("served from catalogue"))
+    run_cmdline(monkeypatch, tmp_path / "out", "-f", "stl", "-b", "manifold", "--catalogue", manifold_catalogue, *quality)
+    assert (tmp_path / "out" / "top.stl").exists()
+
+def test_cmdline_max_time_applies_to_catalogue(tmp_path, monkeypatch, manifold_catalogue):
+    monkeypatch.setattr(sys, "argv", ["cmdline.py", str(tmp_path / "out"), "-f", "stl", "-b", "manifold", "--catalogue", str(manifold_catalogue), "--max-time", "0"])
+    with pytest.raises(RuntimeError):
+        cmdline.main()
+    assert not (tmp_path / "out").exists()
@@ -0,0 +1,45 @@
+import os
+import sys
+import types
+
+import cmdline
+
+
+def test_write_codes_skips_unchanged(tmp_path):
+    cmdline.write_codes(tmp_path, [("a", "cube(1);"), ("b", "cube(2);")])
+    for name in "ab":
+        os.utime(tmp_path / f"{name}.scad", ns=(0, 0))
+    cmdline.write_codes(tmp_path, [("a", "cube(1);"), ("b", "cube(3);")])
+    assert (tmp_path / "a.scad").stat().st_mtime_ns == 0
+    assert (tmp_path / "b.scad").stat().st_mtime_ns != 0
+    assert (tmp_path / "b.scad").read_text() == "cube(3);"
+
+def test_depends_on():
+    base = types.ModuleType("base")
+    class Thing:
+        pass
+    Thing.__module__ = "base"
+    module_import = types.ModuleType("module_import")
+    module_import.base = base
+    name_import = types.ModuleType("name_import")
+    name_import.Thing = Thing
+    unrelated = types.ModuleType("unrelated")
+    unrelated.sys = sys
+    assert cmdline.depends_on(module_import, {"base"})
+    assert cmdline.depends_on(name_import, {"base"})
+    assert not cmdline.depends_on(unrelated, {"base"})
+
+def test_reload_modules_follows_imports(tmp_path, monkeypatch):
+    (tmp_path / "watch_base.py").write_text("VALUE = 1\n")
+    (tmp_path / "watch_user.py").write_text("from watch_base import VALUE\nimport watch_base\n")
+    (tmp_path / "watch_other.py").write_text("VALUE = 3\n")
+    monkeypatch.syspath_prepend(tmp_path)
+    names = ["watch_base", "watch_user", "watch_other"]
+    monkeypatch.setattr(cmdline, "WATCHED_MODULES", names)
+    for name in names:
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    import watch_base, watch_user, watch_other
+
+    (tmp_path / "watch_base.py").write_text("VALUE = 2\n")
+    assert cmdline.reload_modules({"watch_base"}) == {"watch_base", "watch_user"}
+    assert watch_user.VALUE == 2
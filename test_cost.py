@@ -0,0 +1,103 @@
+import argparse
+
+import pytest
+from muscad import Cube, Cylinder, Circle
+from muscad_tools import screws
+
+import cmdline
+import cost
+import model
+
+
+def test_measure_primitive():
+    f = cost.measure(Cube(1, 2, 3))
+    assert f.nodes == 1
+    assert f.facets == 12
+    assert f.booleans == 0
+
+def test_measure_booleans():
+    f = cost.measure(Cube(1, 1, 1) + Cube(2, 2, 2) - Cube(3, 3, 3))
+    assert f.booleans == 2
+    assert f.boolean_depth == 2
+    # the union works on both cubes, the difference on all three
+    assert f.boolean_facets == 24 + 36
+
+def test_measure_rotational_extrusion():
+    f = cost.measure(Circle(d=2, segments=20).translate(x=5).rotational_extrude(90.0, segments=100))
+    assert f.segments == 25
+    assert f.facets == 2*20*25 + 2*20
+
+def test_measure_skips_disabled():
+    assert cost.measure(Cube(1, 1, 1).disable()).nodes == 0
+
+def test_measure_fasteners():
+    bolt = screws.Screw(length=20.0, metric=screws.Metric.m4, standard=screws.Standard.din912).add_nut()
+    assert cost.measure(bolt).fasteners == 2
+
+def test_reduce_segments_shared():
+    c = Cylinder(d=10, h=1, segments=100)
+    obj = c + c.y_mirror() + Cylinder(d=1, h=1, segments=6)
+    cost.reduce_segments(obj, 0.5)
+    assert c.segments == 50
+    assert obj.children[-1].segments == 6
+
+def test_estimate():
+    calibration = cost.Calibration(seconds={"constant": 1.0, "nodes": 0.5}, triangles={"facets": 0.5})
+    assert calibration.estimate(cost.Features(nodes=4, facets=10)) == cost.Estimate(seconds=3.0, triangles=5)
+
+def test_makespan():
+    estimates = {name: cost.Estimate(seconds=s, triangles=0) for name, s in [("a", 2.0), ("b", 3.0), ("c", 2.0)]}
+    assert cost.longest_first(estimates)[0] == "b"
+    assert cost.makespan(estimates, 1) == 7.0
+    assert cost.makespan(estimates, 2) == 4.0
+
+def test_plan_full_quality_is_unchanged():
+    calibration = cost.load_calibration("manifold")
+    quality, parts, estimates = cost.plan(model.parts, calibration)
+    assert quality == "full"
+    assert {name: str(part) for name, part in parts} == dict(model.generate())
+    assert all(e.seconds > 0 and e.triangles > 0 for e in estimates.values())
+
+def test_plan_auto_quality():
+    calibration = cost.load_calibration("manifold")
+    _, _, full = cost.plan(model.parts, calibration)
+    quality, _, reduced = cost.plan(model.parts, calibration, "auto", budget=0.9*cost.makespan(full, 1))
+    assert quality != "full"
+    assert cost.makespan(reduced, 1) < cost.makespan(full, 1)
+
+def test_plan_limit():
+    calibration = cost.load_calibration("manifold")
+    with pytest.raises(RuntimeError):
+        cost.plan(model.parts, calibration, "auto", budget=0.0, limit=0.0)
+
+def test_missing_calibration():
+    data = {"manifold": {"seconds": {"nodes": 1.0}, "triangles": {"facets": 1.0}}}
+    assert cost.calibration_from_dict(data, "manifold") is not None
+    assert cost.calibration_from_dict(data, "wasm") is None
+
+def test_plan_without_calibration():
+    quality, parts, estimates = cost.plan(model.parts, None, "draft")
+    assert quality == "draft"
+    assert estimates == {}
+    assert [name for name, _ in parts] == [name for name, _ in model.parts()]
+    with pytest.raises(RuntimeError):
+        cost.plan(model.parts, None, "auto")
+    with pytest.raises(RuntimeError):
+        cost.plan(model.parts, None, limit=100.0)
+
+def test_fit_is_non_negative():
+    pytest.importorskip("numpy")
+    import calibrate_cost
+    samples = [{"features": {"nodes": n, "fasteners": f}, "seconds": 1.0 + 2.0*n - 0.5*f} for n in range(1, 6) for f in range(4)]
+    coefficients = calibrate_cost.fit(samples, "seconds", ["constant", "nodes", "fasteners"])
+    assert "fasteners" not in coefficients
+    assert all(c > 0 for c in coefficients.values())
+    exact = [{"features": {"nodes": n, "fasteners": f}, "seconds": 1.0 + 2.0*n + 0.5*f} for n in range(1, 6) for f in range(4)]
+    assert calibrate_cost.fit(exact, "seconds", ["constant", "nodes", "fasteners"]) == pytest.approx({"constant": 1.0, "nodes": 2.0, "fasteners": 0.5})
+
+def test_plan_parts_longest_first():
+    args = argparse.Namespace(backend="manifold", quality="full", jobs=1, time_budget=None, max_time=None)
+    quality, parts = cmdline.plan_parts(args, {})
+    assert quality == "full"
+    names = [name for name, _ in parts]
+    assert names[-1] == "padding_holder"
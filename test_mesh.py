@@ -0,0 +1,88 @@
+import math
+import shutil
+import subprocess
+
+import pytest
+
+pytest.importorskip("manifold3d")
+
+from muscad import Cube, Cylinder, Square, Circle
+
+import bounds
+import mesh
+import model
+
+
+def test_cube():
+    m = mesh.to_manifold(Cube(2, 3, 4).translate(x=1))
+    assert m.volume() == pytest.approx(24.0)
+    assert m.bounding_box() == pytest.approx((0, -1.5, -2, 2, 1.5, 2))
+
+def test_difference():
+    assert mesh.to_manifold(Cube(2, 2, 2) - Cube(1, 1, 4)).volume() == pytest.approx(6.0)
+
+def test_linear_extrude():
+    m = mesh.to_manifold(Square(2, 4).linear_extrude(10))
+    assert m.volume() == pytest.approx(80.0)
+    assert m.bounding_box() == pytest.approx((-1, -2, 0, 1, 2, 10))
+
+def test_cylinder_volume():
+    segments = 6
+    polygon_area = segments/2 * math.sin(2*math.pi/segments)
+    assert mesh.to_manifold(Cylinder(h=2, d=2, segments=segments)).volume() == pytest.approx(2*polygon_area)
+
+def test_rotational_extrude_negative_side():
+    # like OpenSCAD, a profile left of the y axis is swept starting from -x
+    obj = Square(1, 1).translate(x=-2.5).rotational_extrude(90, segments=100)
+    m = mesh.to_manifold(obj)
+    assert max(m.bounding_box()[3:5]) <= 1e-6
+    assert m.bounding_box()[:2] == pytest.approx((-3, -3), abs=1e-3)
+
+def test_zero_height_extrusion_is_dropped():
+    m = mesh.to_manifold(Cube(2, 2, 2) + Square(2, 2).z_linear_extrude(distance=0))
+    assert m.volume() == pytest.approx(8)
+
+def test_2d_result_rejected():
+    with pytest.raises(RuntimeError):
+        mesh.to_manifold(Circle(d=2))
+
+@pytest.mark.parametrize("parameters", [{}, {"height_offset": 2.5}, {"height_offset": 2.5, "fill_bottom": "none"}])
+@pytest.mark.parametrize("name", ["top", "bottom", "padding_holder"])
+def test_parts_match_bounds(name, parameters):
+    part = dict(model.parts(**parameters))[name]
+    m = mesh.to_manifold(part)
+    assert m.status().name == "NoError"
+    assert m.num_tri() > 0
+    b = bounds.of(part)
+    assert m.bounding_box() == pytest.approx((b.left, b.back, b.bottom, b.right, b.front, b.top), abs=1e-3)
+
+
+def read_ascii_stl(path):
+    vertices = []
+    with open(path) as f:
+        for line in f:
+            fields = line.split()
+            if fields and fields[0] == "vertex":
+                vertices.append(tuple(float(v) for v in fields[1:]))
+    return [vertices[i:i+3] for i in range(0, len(vertices), 3)]
+
+def stl_volume(triangles):
+    return sum(
+            a[0]*(b[1]*c[2] - b[2]*c[1]) - a[1]*(b[0]*c[2] - b[2]*c[0]) + a[2]*(b[0]*c[1] - b[1]*c[0])
+            for a, b, c in triangles) / 6
+
+@pytest.mark.skipif(shutil.which("openscad") is None, reason="openscad not installed")
+@pytest.mark.parametrize("name", ["top", "bottom", "padding_holder"])
+def test_parts_match_openscad(tmp_path, name):
+    part = dict(model.parts())[name]
+    scad = tmp_path / f"{name}.scad"
+    stl = tmp_path / f"{name}.stl"
+    scad.write_text(str(part))
+    subprocess.run(["openscad", "--enable=manifold", "--export-format", "asciistl", "-o", stl, scad], check=True)
+    triangles = read_ascii_stl(stl)
+    points = [p for t in triangles for p in t]
+    expected_box = [min(p[i] for p in points) for i in range(3)] + [max(p[i] for p in points) for i in range(3)]
+
+    m = mesh.to_manifold(part)
+    assert m.volume() == pytest.approx(stl_volume(triangles), rel=1e-3)
+    assert m.bounding_box() == pytest.approx(expected_box, abs=1e-2)